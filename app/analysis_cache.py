@@ -0,0 +1,164 @@
+# ==================== CACHE DE ANÁLISES DA IA ====================
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def canonicalize_message(message: str) -> str:
+    """Forma canônica da mensagem: minúsculas, sem acentos e espaços colapsados"""
+    text = unicodedata.normalize("NFKD", str(message or "").casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def prompt_version_for(*parts: str) -> str:
+    """Versão curta derivada do texto do prompt/modelo (muda quando o prompt muda)"""
+    digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+    return digest[:12]
+
+
+class AnalysisCache:
+    """Cache em dois níveis (LRU em memória + tabela PostgreSQL opcional) para analyze_message"""
+
+    def __init__(
+        self,
+        prompt_version: str,
+        max_size: int = 5000,
+        ttl: float = 86400.0,
+        pool_getter: Optional[Callable[[], Awaitable]] = None,
+        pg_max_rows: int = 100000,
+    ):
+        self.prompt_version = prompt_version
+        self.memory = TTLCache(max_size=max_size, ttl=ttl, name="ai_analysis")
+        self.ttl = ttl
+        self.pool_getter = pool_getter
+        self.pg_max_rows = pg_max_rows
+        self._pg_writes = 0
+        self.pg_hits = 0
+        self.pg_errors = 0
+        self.stores = 0
+        self._llm_calls = 0
+        self._llm_latency_ms = 0.0
+        self.latency_saved_ms = 0.0
+
+    @property
+    def pg_enabled(self) -> bool:
+        return self.pool_getter is not None
+
+    def _pg_key(self, canonical: str) -> str:
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _avg_llm_latency_ms(self) -> float:
+        return self._llm_latency_ms / self._llm_calls if self._llm_calls else 0.0
+
+    async def purge_stale(self, conn):
+        """Descarta entradas de outras versões do prompt e expiradas (tabela criada pela migração 0003)"""
+        await conn.execute(
+            'DELETE FROM ai_analysis_cache WHERE prompt_version <> $1 OR expires_at < NOW()',
+            self.prompt_version
+        )
+
+    async def get(self, message: str) -> Optional[Dict]:
+        """Busca análise em memória e depois no PostgreSQL (promovendo para memória)"""
+        canonical = canonicalize_message(message)
+        result = self.memory.get(canonical)
+
+        if result is None and self.pg_enabled:
+            try:
+                pool = await self.pool_getter()
+                async with pool.acquire() as conn:
+                    raw = await conn.fetchval('''
+                        SELECT result FROM ai_analysis_cache
+                        WHERE key = $1 AND prompt_version = $2 AND expires_at > NOW()
+                    ''', self._pg_key(canonical), self.prompt_version)
+                if raw is not None:
+                    result = json.loads(raw)
+                    self.memory.set(canonical, result)
+                    self.pg_hits += 1
+            except Exception as e:
+                self.pg_errors += 1
+                logger.warning("Cache de análise PostgreSQL indisponível: %s", e)
+
+        if result is None:
+            return None
+
+        self.latency_saved_ms += self._avg_llm_latency_ms()
+        return dict(result)
+
+    async def set(self, message: str, result: Dict, latency_ms: float):
+        """Armazena a análise da IA nos dois níveis e registra a latência da chamada"""
+        canonical = canonicalize_message(message)
+        self._llm_calls += 1
+        self._llm_latency_ms += latency_ms
+        self.memory.set(canonical, dict(result))
+        self.stores += 1
+
+        if not self.pg_enabled:
+            return
+        try:
+            pool = await self.pool_getter()
+            async with pool.acquire() as conn:
+                await conn.execute('''
+                    INSERT INTO ai_analysis_cache (key, prompt_version, message, result, expires_at)
+                    VALUES ($1, $2, $3, $4, NOW() + make_interval(secs => $5))
+                    ON CONFLICT (key) DO UPDATE SET
+                        prompt_version = EXCLUDED.prompt_version,
+                        result = EXCLUDED.result,
+                        created_at = CURRENT_TIMESTAMP,
+                        expires_at = EXCLUDED.expires_at
+                ''', self._pg_key(canonical), self.prompt_version, canonical,
+                     json.dumps(result), float(self.ttl))
+
+                # Poda periódica: expirados + excedente além do tamanho máximo
+                self._pg_writes += 1
+                if self._pg_writes % 100 == 0:
+                    await conn.execute('''
+                        DELETE FROM ai_analysis_cache
+                        WHERE expires_at < NOW()
+                           OR key IN (
+                               SELECT key FROM ai_analysis_cache
+                               ORDER BY created_at DESC
+                               OFFSET $1
+                           )
+                    ''', self.pg_max_rows)
+        except Exception as e:
+            self.pg_errors += 1
+            logger.warning("Falha ao gravar cache de análise PostgreSQL: %s", e)
+
+    async def invalidate(self, prompt_version: Optional[str] = None):
+        """Troca a versão do prompt e descarta as entradas antigas dos dois níveis"""
+        if prompt_version:
+            self.prompt_version = prompt_version
+        self.memory.clear()
+        if self.pg_enabled:
+            pool = await self.pool_getter()
+            async with pool.acquire() as conn:
+                await conn.execute(
+                    'DELETE FROM ai_analysis_cache WHERE prompt_version <> $1',
+                    self.prompt_version
+                )
+
+    def stats(self) -> Dict:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.pg_hits
+        return {
+            "prompt_version": self.prompt_version,
+            "postgres_tier": self.pg_enabled,
+            "memory": memory,
+            "postgres_hits": self.pg_hits,
+            "postgres_errors": self.pg_errors,
+            "stores": self.stores,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0,
+            "avg_llm_latency_ms": round(self._avg_llm_latency_ms(), 1),
+            "latency_saved_ms": round(self.latency_saved_ms, 1),
+        }
@@ -0,0 +1,104 @@
+# ==================== MICRO-BATCHING ASSÍNCRONO ====================
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+class BatchItemError(Exception):
+    """O lote foi processado mas não trouxe resultado válido para este item"""
+
+
+class MicroBatcher:
+    """Agrupa chamadas concorrentes em uma janela de tempo e as processa em um único lote.
+
+    `handler` recebe a lista de itens e devolve uma lista do mesmo tamanho; `None` na
+    posição de um item faz o chamador receber BatchItemError (e usar o caminho individual).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Optional[Any]]]],
+        window_ms: float = 50,
+        max_batch: int = 20,
+        name: str = "batcher",
+    ):
+        self.handler = handler
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.name = name
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+        self.item_errors = 0
+        self.batch_errors = 0
+        self.max_batch_seen = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Enfileira o item no lote atual e aguarda o resultado individual"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[tuple]):
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            self.batch_errors += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        results = list(results or [])
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            result = results[index] if index < len(results) else None
+            if result is None:
+                self.item_errors += 1
+                future.set_exception(BatchItemError(f"{self.name}: item {index} sem resultado válido"))
+            else:
+                future.set_result(result)
+
+    async def drain(self):
+        """Despacha o lote pendente e aguarda os lotes em andamento"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "max_batch_seen": self.max_batch_seen,
+            "item_errors": self.item_errors,
+            "batch_errors": self.batch_errors,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,328 @@
+# ==================== MICROBENCHMARKS DO SCORING (SEM BANCO NEM OPENAI) ====================
+# Uso:
+#   python -m app.bench                  # compara com app/bench_baseline.json
+#   python -m app.bench --save           # grava um novo baseline
+#   python -m app.bench --only score_message --threshold 0.10
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Sequence, Tuple
+
+from app.keywords import extract_features
+from app.scoring import (
+    fallback_analysis, normalize_phone, nurture_reply, qualification_reply, sales_reply, score_message
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "bench_baseline.json")
+
+# Mensagens reais de leads (anonimizadas), do cumprimento ao pedido qualificado
+MESSAGES = [
+    "oi",
+    "Olá",
+    "bom dia",
+    "e ai",
+    "ok",
+    "obrigado!",
+    "trabalham com que?",
+    "vcs fazem o que exatamente?",
+    "quanto custa um laudo?",
+    "qual o valor da perícia particular?",
+    "preço para laudo de BPC/LOAS",
+    "preciso do laudo BPC urgente, audiência amanhã",
+    "Preciso de um laudo médico para BPC do meu filho autista",
+    "sou advogado previdenciário e atendo muitos casos de BPC",
+    "Sou advogada trabalhista, vocês fazem perícia de insalubridade?",
+    "tenho um escritório com 40 clientes aguardando laudo pericial",
+    "necessito de laudo para aposentadoria por invalidez hoje",
+    "meu cliente tem audiência hoje às 14h e precisa de parecer médico",
+    "Boa tarde! Sou especialista em direito previdenciário, quero conhecer o serviço",
+    "vocês emitem laudo para auxílio-doença negado pelo INSS?",
+    "gostaria de saber se atendem casos trabalhistas de LER/DORT",
+    "tenho interesse em seguro de vida",
+    "vocês fazem empréstimo consignado para aposentado?",
+    "quero financiamento de imóvel",
+    "tem curso de capacitação em perícia médica?",
+    "vi o anúncio no instagram, como funciona?",
+    "meu pai tem Alzheimer, ele tem direito a BPC?",
+    "o INSS negou meu benefício, o que eu faço?",
+    "advogado aqui. quantos dias leva para sair o laudo?",
+    "Olá, trabalho em escritório de advocacia e temos vários casos de incapacidade laboral",
+    "pode me mandar a tabela de preços?",
+    "não tenho interesse",
+    "👍",
+    "?",
+    "laudo",
+    "BPC",
+    "urgente!!!",
+    "quero falar com um atendente",
+    "preciso urgente de perícia para processo trabalhista, audiência amanhã cedo",
+    "Prezados, sou advogado especializado em previdenciário com carteira de 200 clientes e "
+    "gostaria de uma proposta para laudos mensais, com prazo e valores por volume.",
+]
+
+PHONES = [
+    "5511999998888",
+    "+55 (11) 99999-8888",
+    "(21) 98765-4321",
+    "011 3333-4444",
+    "+31 619 255 082",
+    "(31) 61925-5082",
+    "31619255082",
+    "0031619255082",
+    "55 31 99876-5432",
+    "whatsapp:+5562991234567",
+    "",
+    "abc",
+]
+
+# Estado atual do lead contra o qual cada mensagem é pontuada
+LEAD_STATES = [(0, "new"), (25, "cold"), (55, "warm"), (80, "qualified"), (95, "qualified"), (70, "customer")]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    func: Callable
+    cases: Sequence[Tuple]
+
+
+def build_benchmarks() -> List[Benchmark]:
+    """Casos pré-computados: cada benchmark mede só a função alvo"""
+    features = [extract_features(message) for message in MESSAGES]
+    analyses = [fallback_analysis(feature) for feature in features]
+    states = [
+        (score, status, analysis, feature)
+        for score, status in LEAD_STATES
+        for analysis, feature in zip(analyses, features)
+    ]
+    reply_states = [
+        (feature, score, status)
+        for score, status in LEAD_STATES
+        for feature in features
+    ]
+    return [
+        Benchmark("normalize_phone", normalize_phone, [(phone,) for phone in PHONES]),
+        Benchmark("extract_features", extract_features, [(message,) for message in MESSAGES]),
+        Benchmark("fallback_analysis", fallback_analysis, [(feature,) for feature in features]),
+        Benchmark("score_message", score_message, states),
+        Benchmark("sales_reply", sales_reply, reply_states),
+        Benchmark("nurture_reply", nurture_reply, [(feature, score) for feature, score, _ in reply_states]),
+        Benchmark("qualification_reply", qualification_reply,
+                  [(feature, score) for feature, score, _ in reply_states]),
+    ]
+
+
+def _run(func: Callable, cases: Sequence[Tuple], rounds: int) -> int:
+    started = time.perf_counter_ns()
+    for _ in range(rounds):
+        for args in cases:
+            func(*args)
+    return time.perf_counter_ns() - started
+
+
+def _reference(n: int = 40) -> int:
+    """Carga fixa de Python puro (dict, str, laço) medida junto de cada benchmark"""
+    counts: Dict[str, int] = {}
+    for i in range(n):
+        key = "k" + str(i % 7)
+        counts[key] = counts.get(key, 0) + i
+    return len(counts)
+
+
+REFERENCE = [()] * 10
+
+
+def measure_time(bench: Benchmark, min_time: float, repeat: int) -> Tuple[float, float]:
+    """(ns por chamada, tempo relativo à carga de referência).
+
+    Calibra as rodadas até `min_time`; ns/op é a melhor de `repeat` amostras curtas.
+    Cada amostra do benchmark é tomada logo após uma da referência, e o relativo é a
+    mediana das razões entre as duas: uma máquina mais lenta (ou ocupada) naquele
+    momento afeta as duas igualmente."""
+    rounds = ref_rounds = 1
+    while _run(bench.func, bench.cases, rounds) < min_time * 1e9:
+        rounds *= 2
+    while _run(_reference, REFERENCE, ref_rounds) < min_time * 1e9:
+        ref_rounds *= 2
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        samples = []
+        for _ in range(repeat):
+            reference = _run(_reference, REFERENCE, ref_rounds) / (ref_rounds * len(REFERENCE))
+            samples.append((_run(bench.func, bench.cases, rounds) / (rounds * len(bench.cases)), reference))
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return min(ns for ns, _ in samples), statistics.median(ns / reference for ns, reference in samples)
+
+
+def measure_memory(bench: Benchmark) -> Dict:
+    """Blocos e bytes alocados (e ainda vivos no pico) por chamada, via tracemalloc.
+
+    O CPython não expõe um contador de alocações: o pico de memória rastreada durante
+    cada chamada é a melhor aproximação de B/op."""
+    tracemalloc.start()
+    try:
+        peaks = []
+        for args in bench.cases:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            result = bench.func(*args)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            del result
+        snapshot_before = tracemalloc.take_snapshot()
+        results = [bench.func(*args) for args in bench.cases]
+        snapshot_after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in snapshot_after.compare_to(snapshot_before, "filename"))
+    del results
+    return {
+        "peak_bytes_per_op": round(sum(peaks) / len(peaks), 1),
+        "retained_blocks_per_op": round(max(0, blocks) / len(bench.cases), 2),
+    }
+
+
+def _canonical(value):
+    """Representação estável (conjuntos ordenados) para o hash das saídas"""
+    if isinstance(value, (set, frozenset)):
+        return sorted(_canonical(item) for item in value)
+    if isinstance(value, tuple):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    return value
+
+
+def output_digest(bench: Benchmark) -> str:
+    """Hash das saídas sobre o corpus: detecta mudança de comportamento, não só de tempo"""
+    digest = hashlib.sha256()
+    for args in bench.cases:
+        digest.update(repr(_canonical(bench.func(*args))).encode())
+    return digest.hexdigest()[:16]
+
+
+def run_benchmarks(only: Sequence[str] = (), min_time: float = 0.02, repeat: int = 25) -> Dict:
+    results = {}
+    for bench in build_benchmarks():
+        if only and bench.name not in only:
+            continue
+        ns_per_op, relative = measure_time(bench, min_time, repeat)
+        results[bench.name] = {
+            "ns_per_op": round(ns_per_op, 1),
+            "relative": round(relative, 4),
+            **measure_memory(bench),
+            "cases": len(bench.cases),
+            "output_digest": output_digest(bench),
+        }
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "results": results,
+    }
+
+
+def merge_best(current: Dict, retry: Dict) -> Dict:
+    """Fica, por benchmark, com a medição de menor `relative` entre duas rodadas"""
+    for name, result in retry["results"].items():
+        if result["relative"] < current["results"][name]["relative"]:
+            current["results"][name] = result
+    return current
+
+
+def regressions(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    return [
+        name for name, result in current["results"].items()
+        if name in baseline.get("results", {})
+        and result["relative"] / baseline["results"][name]["relative"] - 1 > threshold
+    ]
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Linhas do relatório; as que começam com "REGRESSÃO"/"SAÍDA" reprovam a rodada.
+
+    A variação é calculada sobre `relative` (tempo ÷ carga de referência), que compara
+    rodadas em máquinas e momentos diferentes; ns/op fica como informação."""
+    lines = []
+    if baseline.get("python") != current["python"]:
+        lines.append(f"aviso: baseline gerado com Python {baseline.get('python')}, "
+                     f"rodando com {current['python']}")
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            lines.append(f"novo       {name:<22} {result['ns_per_op']:>10.1f} ns/op (sem baseline)")
+            continue
+        ratio = result["relative"] / base["relative"] - 1
+        tag = "REGRESSÃO" if ratio > threshold else "melhora" if ratio < -threshold else "ok"
+        lines.append(
+            f"{tag:<10} {name:<22} {ratio * 100:+6.1f}%  {result['ns_per_op']:>10.1f} ns/op"
+            f" (base {base['ns_per_op']:.1f})  {result['peak_bytes_per_op']:>8.1f} B/op"
+            f" (base {base['peak_bytes_per_op']:.1f})"
+        )
+        if base["output_digest"] != result["output_digest"]:
+            lines.append(f"SAÍDA      {name:<22} resultado mudou para o corpus (rode --save se intencional)")
+    return lines
+
+
+def main():
+    # Seed de hash fixa: a ordem interna de sets/dicts de strings muda o tempo entre processos
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        os.execve(sys.executable, [sys.executable, "-m", "app.bench", *sys.argv[1:]],
+                  {**os.environ, "PYTHONHASHSEED": "0"})
+
+    parser = argparse.ArgumentParser(description="Microbenchmarks do scoring, normalização e respostas")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="grava o resultado como novo baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="regressão tolerada (0.25 = +25%%)")
+    parser.add_argument("--only", nargs="*", default=(), help="nomes dos benchmarks a rodar")
+    parser.add_argument("--min-time", type=float, default=0.02, help="segundos por amostra")
+    parser.add_argument("--repeat", type=int, default=25, help="amostras por benchmark (vale a menor)")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="remedições de um benchmark acima do limite antes de reprovar")
+    parser.add_argument("--json", help="grava o resultado desta rodada também neste arquivo")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.only, args.min_time, args.repeat)
+    baseline = None
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for _ in range(args.retries):
+            flagged = regressions(current, baseline, args.threshold)
+            if not flagged:
+                break
+            current = merge_best(current, run_benchmarks(flagged, args.min_time, args.repeat))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        for name, result in current["results"].items():
+            print(f"{name:<22} {result['ns_per_op']:>10.1f} ns/op  {result['peak_bytes_per_op']:>8.1f} B/op")
+        print(f"Baseline salvo em {args.baseline}")
+        return
+
+    if baseline is None:
+        print(f"Sem baseline em {args.baseline}: rode com --save primeiro", file=sys.stderr)
+        sys.exit(2)
+    lines = compare(current, baseline, args.threshold)
+    print("\n".join(lines))
+    if any(line.startswith(("REGRESSÃO", "SAÍDA")) for line in lines):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
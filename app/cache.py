@@ -0,0 +1,177 @@
+# ==================== CACHE LRU + TTL EM MEMÓRIA ====================
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU limitado com expiração por TTL e contadores de hit/miss/eviction"""
+
+    def __init__(self, max_size: int = 1000, ttl: float = 300.0, name: str = "cache"):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """Retorna o valor (e marca como recente) ou `default` se ausente/expirado"""
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._data[key]
+            self.expirations += 1
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Insere/atualiza o valor, removendo o menos recente se passar do limite"""
+        if self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove a chave; retorna True se existia"""
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SingleFlightValue:
+    """Valor único com TTL, carga single-flight e stale-while-revalidate.
+
+    Dentro do TTL devolve o valor em memória. Depois do TTL (até `max_stale`)
+    devolve o valor antigo e dispara uma única recarga em background. Sem valor
+    utilizável, todas as chamadas concorrentes aguardam a mesma carga.
+
+    `invalidate()` avança a geração: uma carga iniciada antes dela ainda responde a
+    quem já a aguardava, mas não é guardada como valor fresco.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl: float = 30.0,
+                 max_stale: float = 300.0, name: str = "value"):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._value: Any = _MISSING
+        self._loaded_at = 0.0
+        self._generated_at: Optional[datetime] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.discarded = 0
+
+    def _age(self) -> float:
+        return time.monotonic() - self._loaded_at
+
+    async def _load(self) -> Tuple[Any, datetime]:
+        generation = self._generation
+        self.loads += 1
+        try:
+            value = await self.loader()
+        except Exception:
+            self.errors += 1
+            raise
+        generated_at = datetime.now(timezone.utc)
+        if generation != self._generation:
+            # Invalidado durante a carga: o resultado pode não ver a escrita que invalidou
+            self.discarded += 1
+        else:
+            self._value = value
+            self._loaded_at = time.monotonic()
+            self._generated_at = generated_at
+        return value, generated_at
+
+    def _start_load(self) -> asyncio.Future:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._load())
+            # Recarga em background: erro fica registrado, valor antigo continua valendo
+            self._inflight.add_done_callback(lambda f: f.cancelled() or f.exception())
+        else:
+            self.coalesced += 1
+        return self._inflight
+
+    async def get(self) -> Tuple[Any, datetime, bool]:
+        """Retorna (valor, gerado_em, stale)"""
+        if self._value is not _MISSING:
+            age = self._age()
+            if age < self.ttl:
+                self.hits += 1
+                return self._value, self._generated_at, False
+            if age < self.ttl + self.max_stale:
+                self.stale_hits += 1
+                self._start_load()
+                return self._value, self._generated_at, True
+
+        self.misses += 1
+        # shield: cancelar um request não cancela a carga compartilhada
+        value, generated_at = await asyncio.shield(self._start_load())
+        return value, generated_at, False
+
+    def invalidate(self):
+        """Força a próxima chamada a recarregar (sem servir o valor antigo nem o de
+        uma carga já em andamento)"""
+        self._generation += 1
+        self._inflight = None
+        self._value = _MISSING
+        self._generated_at = None
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "ttl_seconds": self.ttl,
+            "max_stale_seconds": self.max_stale,
+            "generated_at": self._generated_at.isoformat() if self._generated_at else None,
+            "age_seconds": round(self._age(), 1) if self._value is not _MISSING else None,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "discarded": self.discarded,
+        }
@@ -0,0 +1,114 @@
+# ==================== DISPATCHER ASSÍNCRONO ORDENADO POR CHAVE ====================
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DispatcherFull(Exception):
+    """Fila do dispatcher atingiu o limite de itens pendentes"""
+
+
+class KeyedDispatcher:
+    """Executa tarefas em ordem por chave (ex.: telefone) e em paralelo entre chaves.
+
+    Cada chave ativa tem um worker que consome sua fila em sequência; um semáforo
+    global limita quantas tarefas rodam ao mesmo tempo.
+    """
+
+    def __init__(self, max_concurrency: int = 10, max_pending: int = 10000, name: str = "dispatcher"):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._semaphore: Optional[asyncio.Semaphore] = None  # criado no loop em execução
+        self._queues: Dict[Hashable, Deque[tuple]] = {}
+        self._workers: Dict[Hashable, asyncio.Task] = {}
+        self._closed = False
+        self.pending = 0
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self.max_wait = 0.0
+
+    def has_capacity(self, count: int = 1) -> bool:
+        """True se `count` tarefas cabem agora abaixo de max_pending"""
+        return not self._closed and self.pending + count <= self.max_pending
+
+    def submit(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args) -> asyncio.Future:
+        """Enfileira `func(*args)` na fila da chave; retorna um future com o resultado"""
+        if self._closed:
+            raise RuntimeError(f"{self.name} encerrado")
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise DispatcherFull(f"{self.name}: {self.pending} tarefas pendentes")
+
+        future = asyncio.get_running_loop().create_future()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Chamadores "fire and forget" não consultam o future: evita aviso de exceção não lida
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        self._queues.setdefault(key, deque()).append((time.monotonic(), func, args, future))
+        self.pending += 1
+        if key not in self._workers:
+            self._workers[key] = asyncio.ensure_future(self._run_key(key))
+        return future
+
+    async def _run_key(self, key: Hashable):
+        queue = self._queues[key]
+        try:
+            while queue:
+                enqueued_at, func, args, future = queue.popleft()
+                async with self._semaphore:
+                    self.pending -= 1
+                    wait = time.monotonic() - enqueued_at
+                    self._wait_total += wait
+                    self.max_wait = max(self.max_wait, wait)
+                    self.running += 1
+                    try:
+                        result = await func(*args)
+                    except Exception as e:
+                        self.failed += 1
+                        logger.error("%s: tarefa falhou para %s: %s", self.name, key, e)
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                    finally:
+                        self.running -= 1
+                        self.processed += 1
+        finally:
+            del self._queues[key]
+            del self._workers[key]
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Para de aceitar tarefas e aguarda as filas esvaziarem; retorna False se expirou"""
+        self._closed = True
+        workers = list(self._workers.values())
+        if not workers:
+            return True
+        done, not_done = await asyncio.wait(workers, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        return not not_done
+
+    def stats(self) -> Dict:
+        started = self.processed + self.running
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.pending,
+            "active_keys": len(self._workers),
+            "running": self.running,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._wait_total / started * 1000, 2) if started else 0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+        }
@@ -0,0 +1,274 @@
+# ==================== EVENTOS AO VIVO DO DASHBOARD (SSE) ====================
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from app.rollup import BUCKET_LABELS, CONVERTED_BUCKETS, NULL_SCORE_BUCKET, QUALIFIED_BUCKETS, score_bucket
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "dashboard_events"
+NOTIFY_MAX_BYTES = 7800
+HOT_SCORE = 75
+
+Event = Tuple[str, Dict]
+
+
+def _lead_info(lead: Dict) -> Dict:
+    return {
+        "phone": lead["phone"],
+        "name": lead.get("name") or "Lead sem nome",
+        "score": lead.get("score"),
+        "status": lead.get("status"),
+        "last_update": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def lead_change_events(previous: Optional[Dict], current: Optional[Dict]) -> List[Event]:
+    """Deltas do dashboard para uma escrita de lead (`previous` None = lead novo,
+    `current` None = lead removido).
+
+    `counts` traz as variações dos contadores (mesmas definições do rollup);
+    `qualified_lead`, `hot_lead` e `hot_lead_removed` alimentam os destaques.
+    """
+    counts = {
+        "total_leads": 0, "scored_leads": 0, "score_sum": 0,
+        "leads_qualificados": 0, "leads_contatados": 0, "leads_convertidos": 0,
+        "by_status": {}, "by_category": {},
+    }
+
+    def apply(lead: Dict, sign: int):
+        status = lead.get("status") or ""
+        score = lead.get("score")
+        bucket = score_bucket(score)
+        counts["total_leads"] += sign
+        if status:
+            counts["by_status"][status] = counts["by_status"].get(status, 0) + sign
+        if bucket == NULL_SCORE_BUCKET:
+            return
+        label = BUCKET_LABELS[bucket]
+        counts["by_category"][label] = counts["by_category"].get(label, 0) + sign
+        counts["scored_leads"] += sign
+        counts["score_sum"] += sign * score
+        counts["leads_qualificados"] += sign * (bucket in QUALIFIED_BUCKETS)
+        counts["leads_contatados"] += sign * (status == "qualified")
+        counts["leads_convertidos"] += sign * (bucket in CONVERTED_BUCKETS)
+
+    if previous is not None:
+        apply(previous, -1)
+    if current is not None:
+        apply(current, 1)
+    counts["by_status"] = {k: v for k, v in counts["by_status"].items() if v}
+    counts["by_category"] = {k: v for k, v in counts["by_category"].items() if v}
+
+    events: List[Event] = []
+    if any(counts.values()):
+        events.append(("counts", counts))
+
+    previous_score = (previous or {}).get("score") or 0
+    if current is None:
+        if previous_score >= HOT_SCORE:
+            events.append(("hot_lead_removed", {"phone": previous["phone"]}))
+        return events
+
+    was_qualified = previous is not None and previous.get("status") == "qualified"
+    if current.get("status") == "qualified" and not was_qualified:
+        events.append(("qualified_lead", _lead_info(current)))
+
+    score = current.get("score") or 0
+    if score >= HOT_SCORE and score != previous_score:
+        events.append(("hot_lead", {**_lead_info(current), "new": previous_score < HOT_SCORE}))
+    elif score < HOT_SCORE <= previous_score:
+        events.append(("hot_lead_removed", {"phone": current["phone"]}))
+    return events
+
+
+def format_sse(event_id: str, event: str, data: Dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class _Subscriber:
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+
+class EventBroker:
+    """Pub/sub em memória: fila limitada por assinante e histórico curto para replay.
+
+    publish() nunca bloqueia: assinante lento que enche a fila é marcado e
+    recebe um snapshot novo em vez dos eventos perdidos.
+    """
+
+    def __init__(self, max_queue: int = 256, history: int = 1000, name: str = "events"):
+        self.name = name
+        self.max_queue = max_queue
+        self.instance = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._history: Deque[Tuple[int, str, Dict]] = deque(maxlen=history)
+        self._subscribers: Set[_Subscriber] = set()
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._seq
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.instance}:{seq}"
+
+    def parse_event_id(self, value: Optional[str]) -> Optional[int]:
+        """Sequência local de um Last-Event-ID; None se for de outra instância/inválido"""
+        if not value:
+            return None
+        instance, _, seq = value.partition(":")
+        if instance != self.instance or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def publish(self, event: str, data: Dict):
+        self._seq += 1
+        entry = (self._seq, event, data)
+        self._history.append(entry)
+        self.published += 1
+        for subscriber in self._subscribers:
+            if subscriber.overflowed:
+                continue
+            try:
+                subscriber.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+                self.dropped += 1
+
+    def publish_many(self, events: List[Event]):
+        for event, data in events:
+            self.publish(event, data)
+
+    def replay_since(self, seq: int) -> Optional[List[Tuple[int, str, Dict]]]:
+        """Eventos após `seq`; None se o histórico já não cobre esse ponto"""
+        if seq > self._seq:
+            return None
+        if seq < self._seq and (not self._history or self._history[0][0] > seq + 1):
+            return None
+        return [entry for entry in self._history if entry[0] > seq]
+
+    async def stream(self, after: Optional[int], snapshot, heartbeat: float = 15.0,
+                     resync_interval: float = 0) -> AsyncIterator[str]:
+        """Gera o stream SSE: replay a partir de `after` (ou snapshot) e depois eventos ao vivo.
+
+        `snapshot(fresh)` é uma coroutine que devolve (payload, seq): o payload do
+        dashboard e a sequência de eventos que ele já reflete. Também é usada para
+        ressincronizar clientes lentos cuja fila transbordou.
+
+        A escrita no banco e a publicação do evento não são atômicas: uma leitura do
+        rollup pode já ver uma escrita cujo delta chega depois e é aplicado de novo.
+        Com `resync_interval` (s) o cliente recebe um snapshot recalculado
+        periodicamente, então um desvio desses dura no máximo um intervalo.
+        """
+        subscriber = _Subscriber(self.max_queue)
+        self._subscribers.add(subscriber)
+        try:
+            backlog = self.replay_since(after) if after is not None else None
+            last_sent = after or 0
+            fresh = False
+            synced_at = time.monotonic()
+            while True:
+                if backlog is None:
+                    payload, last_sent = await snapshot(fresh)
+                    synced_at = time.monotonic()
+                    fresh = False
+                    yield format_sse(self.event_id(last_sent), "snapshot", payload)
+                    backlog = self.replay_since(last_sent) or []
+                for seq, event, data in backlog:
+                    if seq > last_sent:
+                        yield format_sse(self.event_id(seq), event, data)
+                        last_sent = seq
+                backlog = []
+
+                if subscriber.overflowed:
+                    # Cliente lento: descarta a fila e manda um snapshot novo
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.overflowed = False
+                    backlog = None
+                    continue
+                if resync_interval > 0 and time.monotonic() - synced_at >= resync_interval:
+                    backlog, fresh = None, True
+                    continue
+                timeout = heartbeat
+                if resync_interval > 0:
+                    timeout = max(0.0, min(heartbeat, synced_at + resync_interval - time.monotonic()))
+                try:
+                    seq, event, data = await asyncio.wait_for(subscriber.queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                backlog = [(seq, event, data)]
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "instance": self.instance,
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+            "history": len(self._history),
+            "last_id": self._seq,
+        }
+
+
+class PgEventRelay:
+    """Repassa eventos entre processos via LISTEN/NOTIFY (workers externos → web)"""
+
+    def __init__(self, broker: EventBroker, pool_getter, channel: str = EVENTS_CHANNEL):
+        self.broker = broker
+        self.pool_getter = pool_getter
+        self.channel = channel
+        self._conn = None
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str):
+        try:
+            self.broker.publish_many([tuple(item) for item in json.loads(payload)])
+        except (ValueError, TypeError) as e:
+            logger.warning("Evento inválido no canal %s: %s", self.channel, e)
+
+    async def send(self, conn, events: List[Event]):
+        """NOTIFY em lotes abaixo do limite de payload do PostgreSQL (8000 bytes)"""
+        payloads: List[str] = []
+        batch: List[str] = []
+        size = 2
+        for event in events:
+            item = json.dumps(event, ensure_ascii=False, default=str)
+            if batch and size + len(item.encode("utf-8")) + 1 > NOTIFY_MAX_BYTES:
+                payloads.append(f"[{','.join(batch)}]")
+                batch, size = [], 2
+            batch.append(item)
+            size += len(item.encode("utf-8")) + 1
+        if batch:
+            payloads.append(f"[{','.join(batch)}]")
+        await conn.execute(
+            "SELECT pg_notify($1, payload) FROM unnest($2::text[]) WITH ORDINALITY AS t(payload, ord) ORDER BY ord",
+            self.channel, payloads
+        )
+
+    async def start(self):
+        pool = await self.pool_getter()
+        self._conn = await pool.acquire()
+        await self._conn.add_listener(self.channel, self._on_notify)
+
+    async def stop(self):
+        if self._conn is None:
+            return
+        pool = await self.pool_getter()
+        try:
+            await self._conn.remove_listener(self.channel, self._on_notify)
+        finally:
+            await pool.release(self._conn)
+            self._conn = None
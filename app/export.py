@@ -0,0 +1,181 @@
+# ==================== EXPORTAÇÃO EM STREAMING (CURSORES NO SERVIDOR) ====================
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+LEAD_COLUMNS = ("id", "phone", "name", "status", "score", "source", "created_at", "updated_at")
+CONVERSATION_COLUMNS = ("id", "phone", "message", "is_bot", "timestamp")
+
+
+class ExportFilters:
+    """Monta o WHERE parametrizado dos filtros de exportação"""
+
+    def __init__(self):
+        self.clauses: List[str] = []
+        self.args: List = []
+
+    def add(self, clause: str, value):
+        if value is None:
+            return
+        self.args.append(value)
+        self.clauses.append(clause.format(f"${len(self.args)}"))
+
+    def where(self) -> str:
+        return f"WHERE {' AND '.join(self.clauses)}" if self.clauses else ""
+
+
+def leads_export_query(status: Optional[str] = None, min_score: Optional[int] = None,
+                       max_score: Optional[int] = None, updated_after: Optional[datetime] = None,
+                       updated_before: Optional[datetime] = None, after_id: Optional[int] = None) -> Tuple[str, List]:
+    filters = ExportFilters()
+    filters.add("status = {}", status)
+    filters.add("score >= {}", min_score)
+    filters.add("score <= {}", max_score)
+    filters.add("updated_at >= {}", updated_after)
+    filters.add("updated_at < {}", updated_before)
+    filters.add("id > {}", after_id)
+    query = f'''
+        SELECT {", ".join(LEAD_COLUMNS)}
+        FROM leads
+        {filters.where()}
+        ORDER BY id
+    '''
+    return query, filters.args
+
+
+def conversations_export_query(phone: Optional[str] = None, status: Optional[str] = None,
+                               min_score: Optional[int] = None, max_score: Optional[int] = None,
+                               since: Optional[datetime] = None, until: Optional[datetime] = None,
+                               after_id: Optional[int] = None) -> Tuple[str, List]:
+    filters = ExportFilters()
+    filters.add("c.phone = {}", phone)
+    filters.add("l.status = {}", status)
+    filters.add("l.score >= {}", min_score)
+    filters.add("l.score <= {}", max_score)
+    filters.add("c.timestamp >= {}", since)
+    filters.add("c.timestamp < {}", until)
+    filters.add("c.id > {}", after_id)
+    join = "JOIN leads l ON l.phone = c.phone" if any(v is not None for v in (status, min_score, max_score)) else ""
+    query = f'''
+        SELECT {", ".join(f"c.{col}" for col in CONVERSATION_COLUMNS)}
+        FROM conversations c
+        {join}
+        {filters.where()}
+        ORDER BY c.id
+    '''
+    return query, filters.args
+
+
+async def iter_chunks(pool_getter: Callable, query: str, args: List, chunk_size: int) -> AsyncIterator[List]:
+    """Lê a query com cursor no servidor, `chunk_size` linhas por vez (memória constante)"""
+    pool = await pool_getter()
+    async with pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            cursor = await conn.cursor(query, *args)
+            while True:
+                rows = await cursor.fetch(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def encode_csv(chunks: AsyncIterator[List], columns: Tuple[str, ...]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in chunks:
+        writer.writerows([_plain(row[col]) for col in columns] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def encode_ndjson(chunks: AsyncIterator[List], columns: Tuple[str, ...]) -> AsyncIterator[bytes]:
+    async for rows in chunks:
+        yield "".join(
+            json.dumps({col: _plain(row[col]) for col in columns}, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Destino do ParquetWriter que entrega os bytes escritos a cada row group"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _arrow_schema(columns: Tuple[str, ...]):
+    import pyarrow as pa
+    types = {
+        "id": pa.int64(), "score": pa.int32(), "is_bot": pa.bool_(),
+        "created_at": pa.timestamp("us", tz="UTC"), "updated_at": pa.timestamp("us", tz="UTC"),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(col, types.get(col, pa.string())) for col in columns])
+
+
+async def encode_parquet(chunks: AsyncIterator[List], columns: Tuple[str, ...]) -> AsyncIterator[bytes]:
+    """Um row group por lote; requer pyarrow (dependência opcional)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns)
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for rows in chunks:
+            table = pa.Table.from_pydict({col: [row[col] for row in rows] for col in columns}, schema=schema)
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS: Dict[str, Callable] = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+    "parquet": encode_parquet,
+}
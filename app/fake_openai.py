@@ -0,0 +1,110 @@
+# ==================== SERVIDOR FALSO COMPATÍVEL COM A API DA OPENAI (TESTE DE CARGA) ====================
+# Uso: python -m app.fake_openai --port 8100 --latency-ms 400 --jitter-ms 150 --error-rate 0.02
+# App: OPENAI_API_KEY=sk-loadtest OPENAI_BASE_URL=http://localhost:8100/v1
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.keywords import extract_features
+
+BATCH_LINE = re.compile(r"^(\d+): (\".*\")$", re.MULTILINE)
+SINGLE_MESSAGE = re.compile(r'Mensagem: "(.*)"\s*\n\s*JSON:', re.DOTALL)
+
+
+def fake_analysis(message: str) -> Dict:
+    """Análise plausível e determinística a partir das palavras-chave (mesmas do scoring real)"""
+    features = extract_features(message)
+    score = 30 + 25 * features.has_product + 20 * features.has_professional + 15 * features.has_urgency
+    score = min(100, score + len(message) % 10)
+    if features.has_professional:
+        intent = "lawyer"
+    elif features.has_urgency:
+        intent = "urgent_case"
+    elif features.has_product:
+        intent = "product_inquiry"
+    else:
+        intent = "casual"
+    return {
+        "intent": intent,
+        "urgency": "high" if features.has_urgency else "low",
+        "score": score,
+        "next_action": "transfer_sales" if score >= 75 else "nurture" if score >= 50 else "qualify_more",
+        "sentiment": "positive" if score >= 60 else "neutral",
+    }
+
+
+def _completion_content(prompt: str) -> str:
+    batch = BATCH_LINE.findall(prompt)
+    if "Mensagens:" in prompt and batch:
+        return json.dumps({"results": [
+            {"id": int(index), **fake_analysis(json.loads(text))} for index, text in batch
+        ]}, ensure_ascii=False)
+    match = SINGLE_MESSAGE.search(prompt)
+    return json.dumps(fake_analysis(match.group(1) if match else prompt), ensure_ascii=False)
+
+
+def create_app(latency_ms: float = 400, jitter_ms: float = 150, error_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI (teste de carga)")
+    app.state.stats = {"requests": 0, "errors": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.stats["requests"] += 1
+        delay = max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        if random.random() < error_rate:
+            app.state.stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {
+                "message": "Erro simulado pelo fake_openai", "type": "server_error", "code": None,
+            }})
+
+        messages: List[Dict] = body.get("messages") or []
+        prompt = messages[-1].get("content", "") if messages else ""
+        content = _completion_content(prompt)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {**app.state.stats, "latency_ms": latency_ms, "jitter_ms": jitter_ms, "error_rate": error_rate}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor falso compatível com a OpenAI para testes de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=400, help="latência média por chamada")
+    parser.add_argument("--jitter-ms", type=float, default=150, help="desvio padrão da latência")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 500")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# ==================== HISTÓRICO PAGINADO (CONVERSAS E LOGS) ====================
+from typing import Dict, List, Optional, Tuple
+
+from app.lead_search import decode_cursor, encode_cursor
+
+MAX_HISTORY_PAGE = 200
+
+# Mais recentes primeiro; `before` = cursor do item mais antigo já exibido.
+# Sem id no índice, (timestamp, id) < (...) vira `timestamp <= $2` no range scan de
+# (phone, timestamp DESC) e o id só desempata.
+HISTORY_QUERIES = {
+    "conversations": '''
+        SELECT id, message, is_bot, timestamp
+        FROM conversations
+        WHERE phone = $1 {before}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT {limit}
+    ''',
+    "automation_logs": '''
+        SELECT id, trigger_type, action_taken, result, timestamp
+        FROM automation_logs
+        WHERE phone = $1 {before}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT {limit}
+    ''',
+}
+
+
+async def history_page(conn, table: str, phone: str, before: Optional[str] = None,
+                       limit: int = 50) -> Tuple[List[Dict], Optional[str]]:
+    """Página de `conversations` ou `automation_logs` (mais recentes primeiro) + cursor da anterior"""
+    limit = max(1, min(limit, MAX_HISTORY_PAGE))
+    args: List = [phone]
+    before_clause = ""
+    if before:
+        moment, row_id = decode_cursor(before)
+        args.extend([moment, row_id])
+        before_clause = "AND (timestamp, id) < ($2, $3)"
+    args.append(limit + 1)
+    query = HISTORY_QUERIES[table].format(before=before_clause, limit=f"${len(args)}")
+
+    rows = await conn.fetch(query, *args)
+    items = [dict(row) for row in rows[:limit]]
+    next_before = None
+    if len(rows) > limit:
+        oldest = items[-1]
+        next_before = encode_cursor(oldest["timestamp"], oldest["id"])
+    return items, next_before
+
+
+def serialize_history(items: List[Dict]) -> List[Dict]:
+    return [{**item, "timestamp": item["timestamp"].isoformat() if item["timestamp"] else None} for item in items]
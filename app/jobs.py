@@ -0,0 +1,255 @@
+# ==================== FILA DURÁVEL DE JOBS (POSTGRESQL) ====================
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOBS_CHANNEL = "automation_jobs"
+
+
+async def enqueue_job(conn, trigger_type: str, payload: Dict, max_attempts: int = 5) -> int:
+    """Insere o job e notifica os workers (1 round trip)"""
+    return await conn.fetchval('''
+        WITH job AS (
+            INSERT INTO automation_jobs (phone, trigger_type, payload, max_attempts)
+            VALUES ($1, $2, $3, $4)
+            RETURNING id
+        )
+        SELECT id FROM job, pg_notify($5, id::text)
+    ''', str(payload.get("phone", "")), trigger_type, json.dumps(payload, default=str),
+         max_attempts, JOBS_CHANNEL)
+
+
+async def enqueue_jobs(conn, jobs: List[Tuple[str, Dict]], max_attempts: int = 5) -> List[int]:
+    """Insere vários jobs (trigger_type, payload) em ordem e notifica uma vez (1 round trip)"""
+    if not jobs:
+        return []
+    rows = await conn.fetch('''
+        WITH job AS (
+            INSERT INTO automation_jobs (phone, trigger_type, payload, max_attempts)
+            SELECT t.phone, t.trigger_type, t.payload, $4
+            FROM unnest($1::varchar[], $2::varchar[], $3::jsonb[]) AS t(phone, trigger_type, payload)
+            RETURNING id
+        ), notified AS (
+            SELECT pg_notify($5, COUNT(*)::text) FROM job
+        )
+        SELECT id FROM job, notified ORDER BY id
+    ''', [str(payload.get("phone", "")) for _, payload in jobs],
+         [trigger_type for trigger_type, _ in jobs],
+         [json.dumps(payload, default=str) for _, payload in jobs],
+         max_attempts, JOBS_CHANNEL)
+    return [row['id'] for row in rows]
+
+
+async def claim_jobs(conn, worker_id: str, limit: int, visibility_timeout: float) -> List[Dict]:
+    """Reserva até `limit` jobs com FOR UPDATE SKIP LOCKED.
+
+    Só o job mais antigo em aberto de cada telefone é elegível, então mensagens do
+    mesmo lead continuam em ordem mesmo com vários workers. Jobs `running` com
+    `locked_until` vencido (worker morreu) voltam a ser elegíveis enquanto houver
+    tentativas; os que já esgotaram (ex.: derrubam o worker por OOM) vão para dead-letter.
+    """
+    rows = await conn.fetch('''
+        WITH expired AS (
+            UPDATE automation_jobs SET
+                status = 'dead',
+                locked_until = NULL,
+                last_error = 'lease expired',
+                updated_at = NOW()
+            WHERE status = 'running' AND locked_until < NOW() AND attempts >= max_attempts
+        )
+        UPDATE automation_jobs SET
+            status = 'running',
+            attempts = attempts + 1,
+            locked_until = NOW() + make_interval(secs => $3),
+            locked_by = $1,
+            updated_at = NOW()
+        WHERE id IN (
+            SELECT j.id FROM automation_jobs j
+            WHERE (
+                (j.status = 'pending' AND j.run_at <= NOW())
+                OR (j.status = 'running' AND j.locked_until < NOW() AND j.attempts < j.max_attempts)
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM automation_jobs earlier
+                WHERE earlier.phone = j.phone
+                  AND earlier.status IN ('pending', 'running')
+                  AND earlier.id < j.id
+            )
+            ORDER BY j.run_at, j.id
+            FOR UPDATE SKIP LOCKED
+            LIMIT $2
+        )
+        RETURNING id, trigger_type, payload, attempts, max_attempts
+    ''', worker_id, limit, float(visibility_timeout))
+    return [
+        {
+            "id": row['id'],
+            "trigger_type": row['trigger_type'],
+            "payload": json.loads(row['payload']),
+            "attempts": row['attempts'],
+            "max_attempts": row['max_attempts'],
+        }
+        for row in rows
+    ]
+
+
+async def complete_job(conn, job_id: int, worker_id: str):
+    await conn.execute('''
+        UPDATE automation_jobs
+        SET status = 'done', locked_until = NULL, last_error = NULL, updated_at = NOW()
+        WHERE id = $1 AND locked_by = $2
+    ''', job_id, worker_id)
+
+
+async def fail_job(conn, job: Dict, worker_id: str, error: str, backoff_base: float, backoff_max: float) -> str:
+    """Agenda nova tentativa com backoff exponencial (com jitter) ou move para dead-letter"""
+    if job["attempts"] >= job["max_attempts"]:
+        status, delay = "dead", 0.0
+    else:
+        status = "pending"
+        delay = min(backoff_max, backoff_base * 2 ** (job["attempts"] - 1))
+        delay *= random.uniform(0.8, 1.2)
+
+    await conn.execute('''
+        UPDATE automation_jobs SET
+            status = $3,
+            run_at = NOW() + make_interval(secs => $4),
+            locked_until = NULL,
+            last_error = $5,
+            updated_at = NOW()
+        WHERE id = $1 AND locked_by = $2
+    ''', job["id"], worker_id, status, delay, error[:1000])
+    return status
+
+
+async def requeue_dead_job(conn, job_id: int) -> bool:
+    """Devolve um job do dead-letter para a fila com tentativas zeradas"""
+    result = await conn.execute('''
+        UPDATE automation_jobs
+        SET status = 'pending', attempts = 0, run_at = NOW(), last_error = NULL, updated_at = NOW()
+        WHERE id = $1 AND status = 'dead'
+    ''', job_id)
+    return result == "UPDATE 1"
+
+
+async def job_queue_counts(conn) -> Dict[str, int]:
+    rows = await conn.fetch('SELECT status, COUNT(*) AS count FROM automation_jobs GROUP BY status')
+    counts = {"pending": 0, "running": 0, "done": 0, "dead": 0}
+    counts.update({row['status']: row['count'] for row in rows})
+    return counts
+
+
+class JobWorker:
+    """Consome a fila de jobs: claim em lote, processa em paralelo, retry/dead-letter"""
+
+    def __init__(
+        self,
+        pool_getter: Callable[[], Awaitable],
+        handler: Callable[[str, Dict], Awaitable],
+        batch_size: int = 10,
+        visibility_timeout: float = 300.0,
+        poll_interval: float = 1.0,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+        worker_id: Optional[str] = None,
+    ):
+        self.pool_getter = pool_getter
+        self.handler = handler
+        self.batch_size = batch_size
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._listen_conn = None
+        self.claimed = 0
+        self.done = 0
+        self.retried = 0
+        self.dead = 0
+
+    def _notify(self, *_):
+        self._wakeup.set()
+
+    async def _listen(self, pool):
+        """LISTEN no canal de jobs para acordar sem esperar o polling"""
+        try:
+            self._listen_conn = await pool.acquire()
+            await self._listen_conn.add_listener(JOBS_CHANNEL, self._notify)
+        except Exception as e:
+            logger.warning("Worker %s: LISTEN indisponível, só polling (%s)", self.worker_id, e)
+
+    async def _process(self, pool, job: Dict):
+        try:
+            await self.handler(job["trigger_type"], job["payload"])
+        except Exception as e:
+            async with pool.acquire() as conn:
+                status = await fail_job(conn, job, self.worker_id, repr(e), self.backoff_base, self.backoff_max)
+            if status == "dead":
+                self.dead += 1
+                logger.error("Job %s movido para dead-letter após %s tentativas: %s", job['id'], job['attempts'], e)
+            else:
+                self.retried += 1
+                logger.warning("Job %s falhou (tentativa %s), nova tentativa agendada: %s", job['id'], job['attempts'], e)
+        else:
+            async with pool.acquire() as conn:
+                await complete_job(conn, job["id"], self.worker_id)
+            self.done += 1
+
+    async def run_once(self) -> int:
+        """Um ciclo de claim + processamento; retorna quantos jobs foram processados"""
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            jobs = await claim_jobs(conn, self.worker_id, self.batch_size, self.visibility_timeout)
+        if jobs:
+            self.claimed += len(jobs)
+            await asyncio.gather(*(self._process(pool, job) for job in jobs))
+        return len(jobs)
+
+    async def run(self):
+        """Loop principal até stop()"""
+        pool = await self.pool_getter()
+        await self._listen(pool)
+        logger.info("Worker %s iniciado (lote %s)", self.worker_id, self.batch_size)
+        try:
+            while not self._stopping:
+                try:
+                    processed = await self.run_once()
+                except Exception as e:
+                    logger.error("Worker %s: erro no ciclo: %s", self.worker_id, e)
+                    processed = 0
+                if processed:
+                    continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._listen_conn is not None:
+                try:
+                    await self._listen_conn.remove_listener(JOBS_CHANNEL, self._notify)
+                finally:
+                    await pool.release(self._listen_conn)
+                    self._listen_conn = None
+            logger.info("Worker %s encerrado", self.worker_id)
+
+    def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+
+    def stats(self) -> Dict:
+        return {
+            "worker_id": self.worker_id,
+            "claimed": self.claimed,
+            "done": self.done,
+            "retried": self.retried,
+            "dead": self.dead,
+        }
@@ -0,0 +1,89 @@
+# ==================== EXTRAÇÃO DE PALAVRAS-CHAVE (PASSAGEM ÚNICA) ====================
+import re
+import unicodedata
+from typing import FrozenSet, Iterable, NamedTuple
+
+# Grupos usados pelo scoring do _handle_message
+PRODUCT_KEYWORDS = ("bpc", "laudo", "perícia", "previdenciário", "trabalhista")
+PROFESSIONAL_KEYWORDS = ("advogado", "escritório", "casos", "clientes")
+URGENCY_KEYWORDS = ("urgente", "preciso", "necessito", "hoje", "amanhã")
+
+# Demais termos usados pelo fallback da IA e pelas respostas
+EXTRA_KEYWORDS = (
+    "especialista", "especializado", "audiência",
+    "preço", "valor", "custo",
+    "seguro", "banco", "empréstimo", "financiamento", "investimento",
+    "curso", "treinamento", "capacitação",
+    "trabalham", "que",
+    "oi", "olá", "hey",
+)
+
+# Mensagens que são apenas cumprimento (comparação exata)
+GREETINGS = ("oi", "olá", "hello", "hey", "e ai")
+
+ALL_KEYWORDS = PRODUCT_KEYWORDS + PROFESSIONAL_KEYWORDS + URGENCY_KEYWORDS + EXTRA_KEYWORDS
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas e sem acentos (mantém espaços e pontuação)"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _compile(keywords: Iterable[str]):
+    folded_to_keyword = {}
+    for keyword in keywords:
+        folded_to_keyword.setdefault(fold_text(keyword), set()).add(keyword)
+
+    # Lookahead de largura zero encontra termos sobrepostos; termos que são prefixo
+    # de outro mais longo no mesmo ponto são adicionados via `implied`.
+    implied = {}
+    for folded in folded_to_keyword:
+        implied[folded] = frozenset().union(*(
+            folded_to_keyword[other] for other in folded_to_keyword if folded.startswith(other)
+        ))
+
+    alternation = "|".join(re.escape(k) for k in sorted(folded_to_keyword, key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))"), implied
+
+
+_KEYWORD_PATTERN, _IMPLIED_KEYWORDS = _compile(ALL_KEYWORDS)
+_FOLDED_GREETINGS = frozenset(fold_text(g) for g in GREETINGS)
+_PRODUCT = frozenset(PRODUCT_KEYWORDS)
+_PROFESSIONAL = frozenset(PROFESSIONAL_KEYWORDS)
+_URGENCY = frozenset(URGENCY_KEYWORDS)
+
+
+class MessageFeatures(NamedTuple):
+    """Registro compacto das palavras-chave encontradas em uma mensagem"""
+    text: str
+    length: int
+    keywords: FrozenSet[str]
+    is_greeting: bool
+    has_product: bool
+    has_professional: bool
+    has_urgency: bool
+
+    def has(self, *keywords: str) -> bool:
+        """True se qualquer um dos termos (na grafia de ALL_KEYWORDS) aparece"""
+        return not self.keywords.isdisjoint(keywords)
+
+
+def extract_features(message: str) -> MessageFeatures:
+    """Varre a mensagem uma única vez (sem distinção de acentos) e retorna as features"""
+    message = message or ""
+    text = fold_text(message)
+    found = set()
+    for match in _KEYWORD_PATTERN.finditer(text):
+        found |= _IMPLIED_KEYWORDS[match.group(1)]
+    keywords = frozenset(found)
+
+    return MessageFeatures(
+        text=text,
+        length=len(message),
+        keywords=keywords,
+        is_greeting=text in _FOLDED_GREETINGS,
+        has_product=not keywords.isdisjoint(_PRODUCT),
+        has_professional=not keywords.isdisjoint(_PROFESSIONAL),
+        has_urgency=not keywords.isdisjoint(_URGENCY),
+    )
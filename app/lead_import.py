@@ -0,0 +1,230 @@
+# ==================== IMPORTAÇÃO EM MASSA DE LEADS (COPY) ====================
+import codecs
+import csv
+import json
+import time
+from collections import deque
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd  # importado no primeiro lote: fora do cold start do servidor
+
+IMPORT_COLUMNS = ("phone", "name", "source", "score", "status")
+VALID_STATUSES = {"new", "cold", "warm", "hot", "qualified", "customer"}
+MAX_REJECTED_SAMPLES = 50
+
+
+def normalize_phones(phones: "pd.Series") -> "pd.Series":
+    """Versão vetorizada de normalize_phone (mesmas regras, sem print por linha)"""
+    clean = phones.fillna("").astype(str).str.replace(r"[^\d]", "", regex=True)
+    dutch = clean.str.startswith("31") & (clean.str.len() > 10)
+    clean = clean.where(~dutch, clean.str[2:])
+    return clean.str.lstrip("0")
+
+
+async def iter_lines(stream: AsyncIterator[bytes], encoding: str = "utf-8-sig") -> AsyncIterator[str]:
+    """Linhas completas de um corpo recebido em pedaços (sem carregar tudo em memória).
+    utf-8-sig descarta o BOM que o Excel grava no início do CSV."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buffer = ""
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.rstrip("\r")
+
+
+class _LineFeed:
+    """Fonte de linhas para um único csv.reader alimentado aos poucos pelo stream assíncrono"""
+
+    def __init__(self):
+        self.lines: deque = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_records(stream: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Registros (nº da linha, dict, erro) de CSV com cabeçalho ou NDJSON (um registro por linha).
+
+    No CSV um campo entre aspas pode conter quebras de linha: as linhas físicas são
+    acumuladas até as aspas fecharem e lidas por um único csv.reader (nº da linha
+    inicial do registro a partir de reader.line_num).
+    """
+    header: Optional[List[str]] = None
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    in_quotes = False
+    line_number = 0
+    async for line in iter_lines(stream):
+        line_number += 1
+        if fmt == "ndjson":
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"JSON inválido: {e.msg}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "registro não é um objeto JSON"
+                continue
+            yield line_number, record, None
+            continue
+
+        feed.lines.append(line + "\n")
+        in_quotes ^= line.count('"') % 2 == 1
+        if in_quotes:
+            continue  # campo entre aspas continua na próxima linha
+        start = reader.line_num + 1
+        values = next(reader)
+        if not values or not any(v.strip() for v in values):
+            continue
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            if "phone" not in header:
+                raise ValueError("CSV sem coluna 'phone' no cabeçalho")
+            continue
+        yield start, dict(zip(header, values)), None
+
+    if feed.lines:
+        # Arquivo terminou com aspas abertas
+        yield reader.line_num + 1, None, "aspas não fechadas no fim do arquivo"
+
+
+class LeadImporter:
+    """Carrega leads em lotes via COPY para uma tabela temporária e faz um único merge em `leads`"""
+
+    def __init__(self, conn, chunk_size: int = 5000, default_source: str = "import"):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.default_source = default_source
+        self.seen: set = set()
+        self.total_rows = 0
+        self.loaded_rows = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.rejected_samples: List[Dict] = []
+        self._started = time.perf_counter()
+
+    def _reject(self, line: int, reason: str):
+        self.rejected += 1
+        if len(self.rejected_samples) < MAX_REJECTED_SAMPLES:
+            self.rejected_samples.append({"line": line, "reason": reason})
+
+    async def start(self):
+        await self.conn.execute('''
+            CREATE TEMP TABLE lead_import_staging (
+                line INTEGER,
+                phone VARCHAR(20),
+                name VARCHAR(255),
+                source VARCHAR(50),
+                score INTEGER,
+                status VARCHAR(20)
+            ) ON COMMIT DROP
+        ''')
+
+    async def load_chunk(self, chunk: List[Tuple[int, Dict]]):
+        """Normaliza/valida um lote com pandas e envia via COPY"""
+        if not chunk:
+            return
+        import pandas as pd
+
+        self.total_rows += len(chunk)
+        # dtype=object: telefones numéricos (NDJSON) não viram float
+        frame = pd.DataFrame([record for _, record in chunk], columns=list(IMPORT_COLUMNS), dtype=object)
+        frame["line"] = [line for line, _ in chunk]
+        frame["phone"] = normalize_phones(frame["phone"])
+
+        invalid_phone = (frame["phone"].str.len() < 8) | (frame["phone"].str.len() > 20)
+        for line in frame.loc[invalid_phone, "line"]:
+            self._reject(int(line), "telefone inválido")
+        frame = frame[~invalid_phone]
+
+        # Duplicados dentro do lote e em relação aos lotes anteriores: vale a primeira ocorrência
+        duplicated = frame["phone"].duplicated() | frame["phone"].isin(self.seen)
+        self.duplicates += int(duplicated.sum())
+        frame = frame[~duplicated].copy()
+        self.seen.update(frame["phone"])
+
+        score = pd.to_numeric(frame["score"], errors="coerce")
+        frame["score"] = score.where(score.between(0, 100), 0).fillna(0).astype(int)
+        status = frame["status"].fillna("").astype(str).str.strip().str.lower()
+        frame["status"] = status.where(status.isin(VALID_STATUSES), "new")
+        frame["source"] = frame["source"].fillna("").astype(str).str.strip().str[:50]
+        frame.loc[frame["source"] == "", "source"] = self.default_source
+        name = frame["name"].fillna("").astype(str).str.strip().str[:255]
+        frame["name"] = name.where(name != "", None)
+
+        records = list(frame[["line", "phone", "name", "source", "score", "status"]].itertuples(index=False, name=None))
+        records = [(int(line), phone, name, source, int(score), status) for line, phone, name, source, score, status in records]
+        await self.conn.copy_records_to_table(
+            "lead_import_staging",
+            records=records,
+            columns=["line", "phone", "name", "source", "score", "status"]
+        )
+        self.loaded_rows += len(records)
+
+    async def merge(self) -> Tuple[List[str], List[str]]:
+        """Merge único staging → leads. Leads existentes só ganham nome se não tinham;
+        os demais não são tocados (sem UPDATE, updated_at e posição em /leads intactos).
+
+        Retorna (telefones inseridos, telefones atualizados).
+        """
+        rows = await self.conn.fetch('''
+            INSERT INTO leads (phone, name, status, score, source)
+            SELECT phone, name, status, score, source
+            FROM lead_import_staging
+            ORDER BY line
+            ON CONFLICT (phone) DO UPDATE SET
+                name = EXCLUDED.name
+                WHERE leads.name IS NULL AND EXCLUDED.name IS NOT NULL
+            RETURNING phone, (xmax = 0) AS inserted
+        ''')
+        inserted = [row['phone'] for row in rows if row['inserted']]
+        updated = [row['phone'] for row in rows if not row['inserted']]
+        return inserted, updated
+
+    def report(self, inserted: int, updated: int) -> Dict:
+        elapsed = time.perf_counter() - self._started
+        return {
+            "total_rows": self.total_rows,
+            "loaded_rows": self.loaded_rows,
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": self.loaded_rows - inserted - updated,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "rejected_samples": self.rejected_samples,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.total_rows / elapsed, 1) if elapsed > 0 else 0,
+        }
+
+
+async def import_leads(conn, records: AsyncIterator[Tuple[int, Optional[Dict], Optional[str]]],
+                       chunk_size: int = 5000, default_source: str = "import") -> Tuple[Dict, List[str], List[str]]:
+    """Importa o stream em uma transação; retorna (relatório, inseridos, atualizados)"""
+    importer = LeadImporter(conn, chunk_size=chunk_size, default_source=default_source)
+    async with conn.transaction():
+        await importer.start()
+        chunk: List[Tuple[int, Dict]] = []
+        async for line, record, error in records:
+            if error:
+                importer.total_rows += 1
+                importer._reject(line, error)
+                continue
+            chunk.append((line, record))
+            if len(chunk) >= chunk_size:
+                await importer.load_chunk(chunk)
+                chunk = []
+        await importer.load_chunk(chunk)
+        inserted, updated = await importer.merge()
+    return importer.report(len(inserted), len(updated)), inserted, updated
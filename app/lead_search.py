@@ -0,0 +1,98 @@
+# ==================== BUSCA E PAGINAÇÃO (KEYSET) DE LEADS ====================
+import base64
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.export import ExportFilters
+
+LEAD_PAGE_COLUMNS = ("id", "phone", "name", "status", "score", "source", "created_at", "updated_at")
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    """Cursor opaco de keyset (timestamp, id)"""
+    raw = f"{moment.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    """Cursor opaco → (timestamp, id); ValueError se inválido"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("utf-8")
+        moment, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(moment), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_leads_query(status: Optional[str] = None, search: Optional[str] = None,
+                       cursor: Optional[str] = None, limit: int = 50) -> Tuple[str, List]:
+    """SELECT paginado por (updated_at, id); busca `limit + 1` para saber se há próxima página"""
+    filters = ExportFilters()
+    filters.add("status = {}", status or None)
+
+    search = (search or "").strip()
+    if search:
+        digits = re.sub(r"\D", "", search)
+        filters.args.append(_like_pattern(search))
+        clause = f"name ILIKE ${len(filters.args)}"
+        if digits:
+            # Telefones são gravados só com dígitos: "+55 (11) 9..." também encontra
+            filters.args.append(_like_pattern(digits))
+            clause += f" OR phone LIKE ${len(filters.args)}"
+        filters.clauses.append(f"({clause})")
+
+    if cursor:
+        updated_at, lead_id = decode_cursor(cursor)
+        filters.args.extend([updated_at, lead_id])
+        filters.clauses.append(f"(updated_at, id) < (${len(filters.args) - 1}, ${len(filters.args)})")
+
+    filters.args.append(limit + 1)
+    query = f'''
+        SELECT {", ".join(LEAD_PAGE_COLUMNS)}
+        FROM leads
+        {filters.where()}
+        ORDER BY updated_at DESC, id DESC
+        LIMIT ${len(filters.args)}
+    '''
+    return query, filters.args
+
+
+async def search_leads(conn, status: Optional[str] = None, search: Optional[str] = None,
+                       cursor: Optional[str] = None, limit: int = 50,
+                       statements=None) -> Tuple[List[Dict], Optional[str]]:
+    """Uma página de leads + cursor da próxima (None na última).
+
+    Com `statements` (StatementRegistry), cada variante de filtro vira um prepared
+    statement da conexão: o SQL só muda com a combinação de filtros, não com os valores.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query, args = search_leads_query(status, search, cursor, limit)
+    if statements is not None:
+        rows = await statements.fetch_sql(conn, query, *args)
+    else:
+        rows = await conn.fetch(query, *args)
+    leads = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = leads[-1]
+        next_cursor = encode_cursor(last["updated_at"], last["id"])
+    return leads, next_cursor
+
+
+async def lead_statuses(conn) -> List[str]:
+    """Status com pelo menos um lead, lidos do rollup (não varre leads)"""
+    rows = await conn.fetch('''
+        SELECT status FROM lead_rollup
+        WHERE status <> ''
+        GROUP BY status
+        HAVING SUM(lead_count) > 0
+        ORDER BY status
+    ''')
+    return [row['status'] for row in rows]
@@ -0,0 +1,135 @@
+# ==================== GRAVAÇÃO EM LOTE DE AUTOMATION_LOGS ====================
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOG_COLUMNS = ("trigger_type", "phone", "action_taken", "result", "timestamp", "metadata")
+
+
+def log_record(trigger_type: str, phone: str, action: str, result: str, metadata: Optional[Dict] = None) -> Tuple:
+    """Linha de automation_logs na ordem de LOG_COLUMNS"""
+    return (
+        trigger_type, phone, action, result, datetime.now(timezone.utc),
+        json.dumps(metadata, ensure_ascii=False) if metadata is not None else None,
+    )
+
+
+class StageTimer:
+    """Duração de cada etapa do pipeline, em ms, para o metadata do log.
+    Com `histogram`, cada etapa também é observada (segundos, label `stage`)."""
+
+    def __init__(self, histogram=None):
+        self._started = self._last = time.perf_counter()
+        self.histogram = histogram
+        self.stages: Dict[str, float] = {}
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = round((now - self._last) * 1000, 2)
+        if self.histogram is not None:
+            self.histogram.observe(now - self._last, stage=stage)
+        self._last = now
+
+    def metadata(self) -> Dict:
+        return {"stages_ms": self.stages, "total_ms": round((time.perf_counter() - self._started) * 1000, 2)}
+
+
+class BufferedLogWriter:
+    """Sink de logs de auditoria: write() só enfileira em memória; um flusher grava via
+    `write_batch` (COPY no PostgreSQL) ao atingir `max_batch` linhas ou a cada
+    `flush_interval` segundos.
+
+    A memória é limitada a `max_buffer` linhas: acima disso (banco lento ou fora)
+    novas linhas são descartadas e contadas em `dropped`, sem bloquear o chamador.
+    """
+
+    def __init__(self, write_batch: Callable[[List[Tuple]], Awaitable], max_batch: int = 500,
+                 flush_interval: float = 1.0, max_buffer: int = 10000, name: str = "log_sink"):
+        self.write_batch = write_batch
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.max_buffer = max(self.max_batch, max_buffer)
+        self.name = name
+        self._buffer: Deque[Tuple] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.written = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+
+    def write(self, trigger_type: str, phone: str, action: str, result: str, metadata: Optional[Dict] = None) -> bool:
+        """Enfileira uma linha (nunca bloqueia); False se descartada por buffer cheio"""
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return False
+        self._buffer.append(log_record(trigger_type, phone, action, result, metadata))
+        self.written += 1
+        self._ensure_started()
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Grava tudo o que está no buffer, em lotes de até `max_batch` linhas"""
+        total = 0
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.max_batch, len(self._buffer)))]
+            try:
+                await self.write_batch(batch)
+            except Exception as e:
+                self.errors += 1
+                # Devolve o lote para a próxima tentativa enquanto couber no limite de memória
+                kept = batch[:max(0, self.max_buffer - len(self._buffer))]
+                self._buffer.extendleft(reversed(kept))
+                self.dropped += len(batch) - len(kept)
+                logger.warning("Falha ao gravar lote de %s (%d linhas): %s", self.name, len(batch), e)
+                break
+            self.batches += 1
+            self.flushed += len(batch)
+            total += len(batch)
+        return total
+
+    async def close(self):
+        """Para o flusher e grava o que restou (shutdown)"""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        self._closing = False
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+            "max_buffer": self.max_buffer,
+        }
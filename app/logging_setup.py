@@ -0,0 +1,147 @@
+# ==================== LOGGING ESTRUTURADO E NÃO BLOQUEANTE ====================
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+TRACE_LOGGER = "app.scoring"
+
+# Atributos padrão de LogRecord; o resto veio de `extra=` e vira campo do JSON
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+_trace_sampled: ContextVar[bool] = ContextVar("trace_sampled", default=False)
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+def _fields(record: logging.LogRecord) -> Dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro: ts, level, logger, msg + campos de `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento (campos de `extra` como chave=valor)"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Só enfileira (nunca faz I/O no event loop); com a fila cheia descarta e conta"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Mensagem e traceback viram texto aqui; os campos de `extra` seguem intactos
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SampledTraceFilter(logging.Filter):
+    """Deixa passar DEBUG só nas mensagens sorteadas por start_trace()"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or _trace_sampled.get()
+
+
+def start_trace(rate: float) -> bool:
+    """Sorteia se o trace DEBUG da mensagem atual (contexto/task atual) será registrado"""
+    sampled = rate >= 1 or (rate > 0 and random.random() < rate)
+    _trace_sampled.set(sampled)
+    return sampled
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """"app.main=INFO,app.scoring=DEBUG" → {"app.main": "INFO", "app.scoring": "DEBUG"}"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", module_levels: str = "",
+                      queue_size: int = 10000, trace_sample_rate: float = 0.0):
+    """Handler de fila no root logger; um thread (QueueListener) escreve em stdout.
+    Idempotente: o módulo principal é importado também pelos CLIs e pelo worker."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(level.upper())
+    levels = parse_levels(module_levels)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    # Trace de scoring: DEBUG habilitado, mas só as mensagens sorteadas chegam à fila
+    trace = logging.getLogger(TRACE_LOGGER)
+    trace.addFilter(SampledTraceFilter())
+    if trace_sample_rate > 0 and TRACE_LOGGER not in levels:
+        trace.setLevel(logging.DEBUG)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Esvazia a fila e para o thread de escrita"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+    }
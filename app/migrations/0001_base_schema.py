@@ -0,0 +1,225 @@
+"""Schema base: leads, conversations (particionada), automation_logs, rollup e busca.
+
+Idempotente (IF NOT EXISTS): em bancos criados antes do versionamento vira a linha de base.
+DDL congelado aqui: mudanças de schema entram como uma nova migração numerada.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def up(conn):
+    # Tabela de leads com constraints e índices otimizados
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS leads (
+            id SERIAL PRIMARY KEY,
+            phone VARCHAR(20) UNIQUE NOT NULL,
+            name VARCHAR(255),
+            status VARCHAR(20) DEFAULT 'new' CHECK (status IN ('new', 'cold', 'warm', 'hot', 'qualified', 'customer')),
+            score INTEGER DEFAULT 0 CHECK (score >= 0 AND score <= 100),
+            source VARCHAR(50) DEFAULT 'whatsapp',
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Trigger para atualizar updated_at automaticamente
+    await conn.execute('''
+        CREATE OR REPLACE FUNCTION update_updated_at_column()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.updated_at = CURRENT_TIMESTAMP;
+            RETURN NEW;
+        END;
+        $$ language 'plpgsql'
+    ''')
+
+    await conn.execute('''
+        DROP TRIGGER IF EXISTS update_leads_updated_at ON leads;
+        CREATE TRIGGER update_leads_updated_at
+            BEFORE UPDATE ON leads
+            FOR EACH ROW
+            EXECUTE FUNCTION update_updated_at_column()
+    ''')
+
+    # Índices para performance máxima
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_leads_phone ON leads(phone)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_leads_status ON leads(status)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_leads_score ON leads(score)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_leads_updated_at ON leads(updated_at DESC)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_leads_score_status ON leads(score, status)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_leads_hot ON leads(score DESC, updated_at DESC) WHERE score >= 75')
+
+    # Tabela de conversas particionada por mês em timestamp. Uma tabela antiga (não
+    # particionada) é mantida até `python -m app.partitions migrate`; as partições
+    # mensais são criadas pela manutenção de partições logo após o startup.
+    kind = await conn.fetchval("SELECT relkind::text FROM pg_class WHERE oid = to_regclass('conversations')")
+    if kind is None:
+        await conn.execute('''
+            CREATE TABLE conversations (
+                id SERIAL,
+                phone VARCHAR(20) NOT NULL,
+                message TEXT NOT NULL,
+                is_bot BOOLEAN DEFAULT FALSE,
+                timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, timestamp),
+                CONSTRAINT fk_conversations_phone
+                    FOREIGN KEY (phone) REFERENCES leads(phone)
+                    ON DELETE CASCADE ON UPDATE CASCADE
+            ) PARTITION BY RANGE (timestamp)
+        ''')
+    if kind != "r":
+        # Rede de segurança: linhas fora das partições mensais (ex.: relógio adiantado)
+        await conn.execute('CREATE TABLE IF NOT EXISTS conversations_default PARTITION OF conversations DEFAULT')
+
+    # Índices para conversations (criados no pai, herdados por cada partição)
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_conversations_phone ON conversations(phone)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp DESC)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_conversations_phone_timestamp ON conversations(phone, timestamp DESC)')
+
+    # Tabela de logs de automação
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS automation_logs (
+            id SERIAL PRIMARY KEY,
+            trigger_type VARCHAR(50) NOT NULL,
+            phone VARCHAR(20) NOT NULL,
+            action_taken VARCHAR(255),
+            result VARCHAR(255),
+            timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            metadata JSONB
+        )
+    ''')
+
+    # Índices para automation_logs
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_automation_logs_phone ON automation_logs(phone)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_automation_logs_timestamp ON automation_logs(timestamp DESC)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_automation_logs_trigger_type ON automation_logs(trigger_type)')
+    await conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_automation_logs_phone_timestamp ON automation_logs(phone, timestamp DESC)'
+    )
+
+    # Rollup incremental de analytics (mantido por triggers de statement em leads)
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS lead_rollup (
+            status VARCHAR(20) NOT NULL,
+            bucket SMALLINT NOT NULL,
+            lead_count BIGINT NOT NULL DEFAULT 0,
+            score_sum BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (status, bucket)
+        )
+    ''')
+
+    await conn.execute('''
+        CREATE OR REPLACE FUNCTION lead_rollup_bucket(score INTEGER) RETURNS SMALLINT AS $$
+            SELECT (CASE
+                WHEN score IS NULL THEN -1
+                WHEN score <= 19 THEN 0
+                WHEN score <= 49 THEN 1
+                WHEN score <= 74 THEN 2
+                WHEN score <= 84 THEN 3
+                ELSE 4
+            END)::SMALLINT
+        $$ LANGUAGE sql IMMUTABLE
+    ''')
+
+    # Deltas agregados por (status, bucket) e aplicados em ordem: cada statement trava
+    # poucas linhas do rollup sempre na mesma ordem (sem deadlock entre writers).
+    # UPDATE que não muda status/score gera delta zero e não toca no rollup.
+    await conn.execute('''
+        CREATE OR REPLACE FUNCTION lead_rollup_update() RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO lead_rollup AS r (status, bucket, lead_count, score_sum)
+            SELECT status, bucket, SUM(sign), SUM(sign * score)
+            FROM (
+                SELECT COALESCE(status, '') AS status, lead_rollup_bucket(score) AS bucket,
+                       1 AS sign, COALESCE(score, 0) AS score
+                FROM new_rows
+                UNION ALL
+                SELECT COALESCE(status, ''), lead_rollup_bucket(score), -1, COALESCE(score, 0)
+                FROM old_rows
+            ) delta
+            GROUP BY status, bucket
+            HAVING SUM(sign) <> 0 OR SUM(sign * score) <> 0
+            ORDER BY status, bucket
+            ON CONFLICT (status, bucket) DO UPDATE SET
+                lead_count = r.lead_count + EXCLUDED.lead_count,
+                score_sum = r.score_sum + EXCLUDED.score_sum;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    await conn.execute('''
+        CREATE OR REPLACE FUNCTION lead_rollup_insert() RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO lead_rollup AS r (status, bucket, lead_count, score_sum)
+            SELECT COALESCE(status, ''), lead_rollup_bucket(score), COUNT(*), COALESCE(SUM(score), 0)
+            FROM new_rows
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+            ON CONFLICT (status, bucket) DO UPDATE SET
+                lead_count = r.lead_count + EXCLUDED.lead_count,
+                score_sum = r.score_sum + EXCLUDED.score_sum;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    await conn.execute('''
+        CREATE OR REPLACE FUNCTION lead_rollup_delete() RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO lead_rollup AS r (status, bucket, lead_count, score_sum)
+            SELECT COALESCE(status, ''), lead_rollup_bucket(score), -COUNT(*), -COALESCE(SUM(score), 0)
+            FROM old_rows
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+            ON CONFLICT (status, bucket) DO UPDATE SET
+                lead_count = r.lead_count + EXCLUDED.lead_count,
+                score_sum = r.score_sum + EXCLUDED.score_sum;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    await conn.execute('''
+        DROP TRIGGER IF EXISTS lead_rollup_on_insert ON leads;
+        CREATE TRIGGER lead_rollup_on_insert
+            AFTER INSERT ON leads
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION lead_rollup_insert();
+        DROP TRIGGER IF EXISTS lead_rollup_on_update ON leads;
+        CREATE TRIGGER lead_rollup_on_update
+            AFTER UPDATE ON leads
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION lead_rollup_update();
+        DROP TRIGGER IF EXISTS lead_rollup_on_delete ON leads;
+        CREATE TRIGGER lead_rollup_on_delete
+            AFTER DELETE ON leads
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION lead_rollup_delete();
+    ''')
+
+    # Rollup vazio (banco novo ou anterior ao rollup): popula a partir de leads
+    if await conn.fetchval('SELECT NOT EXISTS (SELECT 1 FROM lead_rollup)'):
+        await conn.execute('LOCK TABLE leads IN SHARE MODE')
+        await conn.execute('''
+            INSERT INTO lead_rollup (status, bucket, lead_count, score_sum)
+            SELECT COALESCE(status, ''), lead_rollup_bucket(score), COUNT(*), COALESCE(SUM(score), 0)
+            FROM leads
+            GROUP BY 1, 2
+        ''')
+
+    # Keyset (updated_at DESC, id DESC): página seguinte é um range scan no índice
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_leads_updated_at_id ON leads(updated_at DESC, id DESC)')
+
+    # Busca de leads: pg_trgm quando disponível; sem a extensão (ou sem permissão
+    # para criá-la) a busca segue com ILIKE em seq scan
+    try:
+        async with conn.transaction():  # savepoint: a falha não aborta a migração
+            await conn.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception as e:
+        logger.warning("pg_trgm indisponível, busca de leads sem índice trigram: %s", e)
+    if await conn.fetchval("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"):
+        await conn.execute('CREATE INDEX IF NOT EXISTS idx_leads_name_trgm ON leads USING gin (name gin_trgm_ops)')
+        await conn.execute('CREATE INDEX IF NOT EXISTS idx_leads_phone_trgm ON leads USING gin (phone gin_trgm_ops)')
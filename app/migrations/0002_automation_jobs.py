@@ -0,0 +1,30 @@
+"""Fila durável de automações (usada com JOB_QUEUE_MODE=postgres; vazia nos demais modos)."""
+
+
+async def up(conn):
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS automation_jobs (
+            id BIGSERIAL PRIMARY KEY,
+            phone VARCHAR(20) NOT NULL DEFAULT '',
+            trigger_type VARCHAR(50) NOT NULL,
+            payload JSONB NOT NULL,
+            status VARCHAR(10) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'dead')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            run_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            locked_until TIMESTAMP WITH TIME ZONE,
+            locked_by VARCHAR(100),
+            last_error TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Índices de claim
+    await conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_automation_jobs_claim
+        ON automation_jobs(run_at, id) WHERE status IN ('pending', 'running')
+    ''')
+    await conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_automation_jobs_phone_open
+        ON automation_jobs(phone, id) WHERE status IN ('pending', 'running')
+    ''')
@@ -0,0 +1,15 @@
+"""Nível persistente do cache de análises da IA (usado com ANALYSIS_CACHE_PG=true)."""
+
+
+async def up(conn):
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS ai_analysis_cache (
+            key CHAR(64) PRIMARY KEY,
+            prompt_version VARCHAR(32) NOT NULL,
+            message TEXT NOT NULL,
+            result JSONB NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+        )
+    ''')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_ai_analysis_cache_created_at ON ai_analysis_cache(created_at)')
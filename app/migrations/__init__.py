@@ -0,0 +1,2 @@
+# Migrações do schema PostgreSQL: arquivos NNNN_descricao.py com `async def up(conn)`,
+# aplicados em ordem por app/schema.py (cada um em uma transação, registrado em schema_version).
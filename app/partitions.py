@@ -0,0 +1,371 @@
+# ==================== PARTICIONAMENTO MENSAL E ARQUIVO DE CONVERSATIONS ====================
+# Uso:
+#   python -m app.partitions ensure [--ahead 3]         cria partições futuras
+#   python -m app.partitions migrate                    converte uma tabela antiga (não particionada)
+#   python -m app.partitions archive --older-than 12    desanexa partições antigas para arquivos
+#   python -m app.partitions query --phone 5511999999999 [--since 2025-01-01] [--until 2025-07-01]
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.export import CONVERSATION_COLUMNS, ENCODERS, iter_chunks, parquet_available
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION = "conversations_default"
+PARTITION_PATTERN = re.compile(r"^conversations_p(\d{4})(\d{2})$")
+ARCHIVE_EXTENSIONS = {"parquet": "parquet", "ndjson": "ndjson.gz"}
+ARCHIVE_MANIFEST = "manifest.json"
+PARTITION_LOCK_KEY = "conversations_partitions"
+
+CREATE_CONVERSATIONS = '''
+    CREATE TABLE IF NOT EXISTS conversations (
+        id SERIAL,
+        phone VARCHAR(20) NOT NULL,
+        message TEXT NOT NULL,
+        is_bot BOOLEAN DEFAULT FALSE,
+        timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, timestamp),
+        CONSTRAINT fk_conversations_phone
+            FOREIGN KEY (phone) REFERENCES leads(phone)
+            ON DELETE CASCADE ON UPDATE CASCADE
+    ) PARTITION BY RANGE (timestamp)
+'''
+
+
+def month_start(moment: datetime, offset: int = 0) -> datetime:
+    """Primeiro instante (UTC) do mês de `moment` deslocado `offset` meses"""
+    index = moment.year * 12 + moment.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"conversations_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    match = PARTITION_PATTERN.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+
+
+def recent_history_start(partitions: int) -> datetime:
+    """Limite inferior do histórico recente: só as `partitions` partições mais novas
+    (a do mês atual incluída) entram no plano, as demais são podadas"""
+    return month_start(datetime.now(timezone.utc), -(max(partitions, 1) - 1))
+
+
+async def _relkind(conn, table: str) -> Optional[str]:
+    return await conn.fetchval('SELECT relkind::text FROM pg_class WHERE oid = to_regclass($1)', table)
+
+
+async def init_conversation_indexes(conn):
+    """Índices criados no pai, herdados por cada partição"""
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_conversations_phone ON conversations(phone)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp DESC)')
+    await conn.execute('CREATE INDEX IF NOT EXISTS idx_conversations_phone_timestamp ON conversations(phone, timestamp DESC)')
+
+
+async def _create_partition(conn, month: datetime) -> bool:
+    name = partition_name(month)
+    upper = month_start(month, 1)
+    async with conn.transaction():
+        # Web e CLI podem rodar a manutenção ao mesmo tempo
+        await conn.execute('SELECT pg_advisory_xact_lock(hashtext($1))', PARTITION_LOCK_KEY)
+        if await _relkind(conn, name) is not None:
+            return False
+        bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        misplaced = await conn.fetchval(
+            f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE timestamp >= $1 AND timestamp < $2)',
+            month, upper
+        )
+        if not misplaced:
+            await conn.execute(f'CREATE TABLE {name} PARTITION OF conversations {bounds}')
+            return True
+        # Mensagens do mês caíram na DEFAULT antes da partição existir: move e anexa
+        await conn.execute(f'CREATE TABLE {name} (LIKE conversations INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        await conn.execute(f'''
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= $1 AND timestamp < $2 RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        ''', month, upper)
+        await conn.execute(f'ALTER TABLE conversations ATTACH PARTITION {name} {bounds}')
+        return True
+
+
+async def ensure_partitions(conn, months_ahead: int = 3, since: Optional[datetime] = None) -> List[str]:
+    """Garante as partições de `since` (padrão: mês atual) até `months_ahead` meses à frente"""
+    now = datetime.now(timezone.utc)
+    month = month_start(since or now)
+    last = month_start(now, months_ahead)
+    created = []
+    while month <= last:
+        if await _create_partition(conn, month):
+            created.append(partition_name(month))
+        month = month_start(month, 1)
+    return created
+
+
+async def list_partitions(conn) -> List[str]:
+    """Partições mensais anexadas, da mais antiga para a mais nova"""
+    rows = await conn.fetch('''
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'conversations'::regclass
+        ORDER BY c.relname
+    ''')
+    return [row['relname'] for row in rows if PARTITION_PATTERN.match(row['relname'])]
+
+
+async def partition_maintenance_loop(pool_getter: Callable, months_ahead: int, interval: float):
+    """Tarefa de fundo: cria as partições dos próximos meses já no boot e depois periodicamente
+    (fora do caminho do startup: o schema versionado não recria partições a cada boot)"""
+    while True:
+        try:
+            pool = await pool_getter()
+            async with pool.acquire() as conn:
+                created = await ensure_partitions(conn, months_ahead)
+            if created:
+                logger.info("Partições criadas: %s", ", ".join(created))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Erro na manutenção de partições: %s", e)
+        await asyncio.sleep(interval)
+
+
+async def migrate_to_partitioned(conn, months_ahead: int = 3) -> int:
+    """Copia uma conversations antiga para a versão particionada (uma transação).
+
+    A tabela original fica como conversations_unpartitioned para conferência;
+    remova-a manualmente depois. Retorna o número de linhas copiadas.
+    """
+    async with conn.transaction():
+        await conn.execute('LOCK TABLE conversations IN ACCESS EXCLUSIVE MODE')
+        if await _relkind(conn, "conversations") != "r":
+            return 0
+        await conn.execute('ALTER TABLE conversations RENAME TO conversations_unpartitioned')
+        await conn.execute('ALTER SEQUENCE IF EXISTS conversations_id_seq RENAME TO conversations_unpartitioned_id_seq')
+        # Libera os nomes de índice para a tabela nova (recriados abaixo com IF NOT EXISTS)
+        indexes = await conn.fetch(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'conversations_unpartitioned'"
+        )
+        for row in indexes:
+            await conn.execute(f'ALTER INDEX {row["indexname"]} RENAME TO {row["indexname"][:48]}_unpartitioned')
+
+        await conn.execute(CREATE_CONVERSATIONS)
+        await conn.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF conversations DEFAULT')
+        await init_conversation_indexes(conn)
+        oldest = await conn.fetchval('SELECT MIN(timestamp) FROM conversations_unpartitioned')
+        await ensure_partitions(conn, months_ahead, since=oldest)
+
+        status = await conn.execute('''
+            INSERT INTO conversations (id, phone, message, is_bot, timestamp)
+            SELECT id, phone, message, is_bot, COALESCE(timestamp, CURRENT_TIMESTAMP)
+            FROM conversations_unpartitioned
+        ''')
+        await conn.execute('''
+            SELECT setval(pg_get_serial_sequence('conversations', 'id'),
+                          GREATEST((SELECT MAX(id) FROM conversations), 1))
+        ''')
+        return int(status.split()[-1])
+
+
+# ==================== ARQUIVO (PARTIÇÕES DESANEXADAS EM DISCO) ====================
+def _load_manifest(directory: Path) -> Dict[str, Dict]:
+    path = directory / ARCHIVE_MANIFEST
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_manifest(directory: Path, manifest: Dict[str, Dict]):
+    path = directory / ARCHIVE_MANIFEST
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+
+
+async def _write_archive(pool_getter: Callable, name: str, fmt: str, path: Path, chunk_size: int) -> int:
+    written = 0
+
+    async def counted():
+        nonlocal written
+        query = f'SELECT {", ".join(CONVERSATION_COLUMNS)} FROM {name} ORDER BY id'
+        async for rows in iter_chunks(pool_getter, query, [], chunk_size):
+            written += len(rows)
+            yield rows
+
+    # Parquet já sai comprimido (zstd); NDJSON vai em gzip
+    opener = gzip.open if fmt == "ndjson" else open
+    with opener(path, "wb") as out:
+        async for data in ENCODERS[fmt](counted(), CONVERSATION_COLUMNS):
+            out.write(data)
+    return written
+
+
+async def archive_partition(pool_getter: Callable, name: str, fmt: str, directory: Path,
+                            chunk_size: int = 2000) -> Dict:
+    """Desanexa a partição, grava o arquivo, confere a contagem e só então remove a tabela.
+    Em caso de erro a partição é anexada de volta."""
+    month = partition_month(name)
+    upper = month_start(month, 1)
+    bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.{ARCHIVE_EXTENSIONS[fmt]}"
+    tmp = path.with_name(path.name + ".tmp")
+
+    pool = await pool_getter()
+    async with pool.acquire() as conn:
+        await conn.execute(f'ALTER TABLE conversations DETACH PARTITION {name}')
+    try:
+        rows = await _write_archive(pool_getter, name, fmt, tmp, chunk_size)
+        async with pool.acquire() as conn:
+            expected = await conn.fetchval(f'SELECT COUNT(*) FROM {name}')
+        if rows != expected:
+            raise RuntimeError(f"{name}: {rows} linhas gravadas, {expected} na tabela")
+        tmp.replace(path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        async with pool.acquire() as conn:
+            await conn.execute(f'ALTER TABLE conversations ATTACH PARTITION {name} {bounds}')
+        raise
+
+    entry = {
+        "file": path.name,
+        "format": fmt,
+        "from": month.isoformat(),
+        "to": upper.isoformat(),
+        "rows": rows,
+        "archived_at": datetime.now(timezone.utc).isoformat(),
+    }
+    manifest = _load_manifest(directory)
+    manifest[name] = entry
+    _save_manifest(directory, manifest)
+
+    async with pool.acquire() as conn:
+        await conn.execute(f'DROP TABLE {name}')
+    return {"partition": name, **entry}
+
+
+async def archive_partitions(pool_getter: Callable, older_than_months: int, fmt: str,
+                             directory: Path, chunk_size: int = 2000) -> List[Dict]:
+    """Arquiva as partições que terminam antes de `older_than_months` meses atrás"""
+    cutoff = month_start(datetime.now(timezone.utc), -older_than_months)
+    pool = await pool_getter()
+    async with pool.acquire() as conn:
+        names = [name for name in await list_partitions(conn) if month_start(partition_month(name), 1) <= cutoff]
+    return [await archive_partition(pool_getter, name, fmt, directory, chunk_size) for name in names]
+
+
+def _read_archive(path: Path, fmt: str, phone: Optional[str]) -> Iterator[Dict]:
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, filters=[("phone", "=", phone)] if phone else None)
+        for row in table.to_pylist():
+            yield dict(row, timestamp=row["timestamp"].isoformat())
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as lines:
+        for line in lines:
+            row = json.loads(line)
+            if phone is None or row["phone"] == phone:
+                yield row
+
+
+def iter_archived_conversations(directory: Path, phone: Optional[str] = None, since: Optional[datetime] = None,
+                                until: Optional[datetime] = None) -> Iterator[Dict]:
+    """Lê de volta conversas arquivadas; o manifesto evita abrir arquivos fora do período"""
+    for name, entry in sorted(_load_manifest(directory).items()):
+        start, end = datetime.fromisoformat(entry["from"]), datetime.fromisoformat(entry["to"])
+        if (since and end <= since) or (until and start >= until):
+            continue
+        for row in _read_archive(directory / entry["file"], entry["format"], phone):
+            moment = datetime.fromisoformat(row["timestamp"])
+            if (since and moment < since) or (until and moment >= until):
+                continue
+            yield row
+
+
+def _parse_moment(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+async def _run_command(args):
+    from app.main import (CONVERSATIONS_ARCHIVE_DIR, CONVERSATIONS_PARTITIONS_AHEAD, EXPORT_CHUNK_SIZE,
+                          close_db_pool, get_db_pool, init_db)
+
+    ahead = args.ahead if args.ahead is not None else CONVERSATIONS_PARTITIONS_AHEAD
+    await init_db()
+    pool = await get_db_pool()
+    try:
+        if args.command == "ensure":
+            async with pool.acquire() as conn:
+                created = await ensure_partitions(conn, ahead)
+            print(f"✅ Partições criadas: {', '.join(created) or 'nenhuma (já existiam)'}")
+        elif args.command == "migrate":
+            async with pool.acquire() as conn:
+                moved = await migrate_to_partitioned(conn, ahead)
+            print(f"✅ {moved} conversas copiadas para a tabela particionada")
+            if moved:
+                print("   Confira e remova a antiga: DROP TABLE conversations_unpartitioned")
+        elif args.command == "archive":
+            if args.format == "parquet" and not parquet_available():
+                raise SystemExit("❌ Formato parquet requer pyarrow (pip install pyarrow)")
+            directory = Path(args.dir or CONVERSATIONS_ARCHIVE_DIR)
+            archived = await archive_partitions(get_db_pool, args.older_than, args.format, directory, EXPORT_CHUNK_SIZE)
+            for item in archived:
+                print(f"📦 {item['partition']}: {item['rows']} linhas → {directory / item['file']}")
+            print(f"✅ {len(archived)} partições arquivadas")
+    finally:
+        await close_db_pool()
+
+
+def _query_command(args):
+    from app.main import CONVERSATIONS_ARCHIVE_DIR, normalize_phone
+
+    directory = Path(args.dir or CONVERSATIONS_ARCHIVE_DIR)
+    phone = normalize_phone(args.phone) if args.phone else None
+    for row in iter_archived_conversations(directory, phone, _parse_moment(args.since), _parse_moment(args.until)):
+        print(json.dumps(row, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partições e arquivo de conversations Previdas")
+    sub = parser.add_subparsers(dest="command")
+    ensure = sub.add_parser("ensure", help="cria as partições dos próximos meses")
+    ensure.add_argument("--ahead", type=int, help="meses à frente (padrão: CONVERSATIONS_PARTITIONS_AHEAD)")
+    migrate = sub.add_parser("migrate", help="converte a tabela antiga em particionada")
+    migrate.add_argument("--ahead", type=int)
+    archive = sub.add_parser("archive", help="desanexa partições antigas para arquivos comprimidos")
+    archive.add_argument("--older-than", type=int, required=True, help="meses mantidos no banco")
+    archive.add_argument("--format", choices=sorted(ARCHIVE_EXTENSIONS), default="ndjson")
+    archive.add_argument("--dir", help="destino (padrão: CONVERSATIONS_ARCHIVE_DIR)")
+    archive.set_defaults(ahead=None)
+    query = sub.add_parser("query", help="lê conversas arquivadas (NDJSON na saída)")
+    query.add_argument("--phone")
+    query.add_argument("--since", help="ISO 8601, inclusivo")
+    query.add_argument("--until", help="ISO 8601, exclusivo")
+    query.add_argument("--dir")
+    args = parser.parse_args()
+
+    if args.command == "query":
+        _query_command(args)
+    elif args.command:
+        asyncio.run(_run_command(args))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
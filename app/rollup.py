@@ -0,0 +1,113 @@
+# ==================== ROLLUP INCREMENTAL DE ANALYTICS ====================
+# Uso (reconciliação): python -m app.rollup --rebuild
+import argparse
+import asyncio
+from typing import Dict, List
+
+# Faixas de score do rollup (75+ é dividido em 75-84 e 85+ para "convertidos")
+SCORE_BUCKETS = (
+    (0, "Muito Frio (0-19)"),
+    (1, "Frio (20-49)"),
+    (2, "Morno (50-74)"),
+    (3, "Quente (75+)"),
+    (4, "Quente (75+)"),
+)
+QUALIFIED_BUCKETS = {3, 4}   # score >= 75
+CONVERTED_BUCKETS = {4}      # score >= 85
+NULL_SCORE_BUCKET = -1
+BUCKET_LABELS = dict(SCORE_BUCKETS)
+
+
+def score_bucket(score) -> int:
+    """Mesma faixa de lead_rollup_bucket() no banco"""
+    if score is None:
+        return NULL_SCORE_BUCKET
+    if score <= 19:
+        return 0
+    if score <= 49:
+        return 1
+    if score <= 74:
+        return 2
+    if score <= 84:
+        return 3
+    return 4
+
+
+async def rebuild_rollup(conn) -> int:
+    """Reconstrói o rollup do zero; bloqueia escritas em leads só durante o recálculo"""
+    async with conn.transaction():
+        await conn.execute('LOCK TABLE leads IN SHARE MODE')
+        await conn.execute('DELETE FROM lead_rollup')
+        await conn.execute('''
+            INSERT INTO lead_rollup (status, bucket, lead_count, score_sum)
+            SELECT COALESCE(status, ''), lead_rollup_bucket(score), COUNT(*), COALESCE(SUM(score), 0)
+            FROM leads
+            GROUP BY 1, 2
+        ''')
+        return await conn.fetchval('SELECT COALESCE(SUM(lead_count), 0) FROM lead_rollup')
+
+
+async def fetch_rollup(conn) -> List[Dict]:
+    """Linhas do rollup (no máximo status × faixas)"""
+    rows = await conn.fetch('SELECT status, bucket, lead_count, score_sum FROM lead_rollup WHERE lead_count <> 0')
+    return [dict(row) for row in rows]
+
+
+def summarize_rollup(rows: List[Dict]) -> Dict:
+    """Métricas do dashboard a partir do rollup (mesmas definições das queries agregadas)"""
+    total = sum(r["lead_count"] for r in rows)
+    scored = [r for r in rows if r["bucket"] != NULL_SCORE_BUCKET]
+    scored_count = sum(r["lead_count"] for r in scored)
+
+    by_status: Dict[str, int] = {}
+    for r in rows:
+        if r["status"]:
+            by_status[r["status"]] = by_status.get(r["status"], 0) + r["lead_count"]
+
+    distribution: Dict[str, int] = {}
+    for bucket, label in SCORE_BUCKETS:
+        count = sum(r["lead_count"] for r in scored if r["bucket"] == bucket)
+        if count:
+            distribution[label] = distribution.get(label, 0) + count
+
+    return {
+        "total_leads": total,
+        "leads_by_status": [
+            {"status": status, "count": count}
+            for status, count in sorted(by_status.items(), key=lambda item: item[1], reverse=True)
+        ],
+        "leads_qualificados": sum(r["lead_count"] for r in scored if r["bucket"] in QUALIFIED_BUCKETS),
+        "leads_contatados": sum(r["lead_count"] for r in scored if r["status"] == "qualified"),
+        "leads_convertidos": sum(r["lead_count"] for r in scored if r["bucket"] in CONVERTED_BUCKETS),
+        "avg_score": round(sum(r["score_sum"] for r in scored) / scored_count, 1) if scored_count else 0,
+        "score_sum": sum(r["score_sum"] for r in scored),
+        "scored_leads": scored_count,
+        "score_distribution": [{"categoria": label, "count": count} for label, count in distribution.items()],
+    }
+
+
+async def _rebuild_command():
+    from app.main import close_db_pool, get_db_pool, init_db
+
+    await init_db()
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        total = await rebuild_rollup(conn)
+        summary = summarize_rollup(await fetch_rollup(conn))
+    await close_db_pool()
+    print(f"✅ Rollup reconstruído: {total} leads")
+    print(f"   {summary}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rollup de analytics Previdas")
+    parser.add_argument("--rebuild", action="store_true", help="reconstrói lead_rollup a partir de leads")
+    args = parser.parse_args()
+    if args.rebuild:
+        asyncio.run(_rebuild_command())
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# ==================== MIGRAÇÕES VERSIONADAS DO SCHEMA ====================
+# Uso:
+#   python -m app.schema status     versão do banco e migrações pendentes
+#   python -m app.schema migrate    aplica as pendentes (rodar antes de um rolling restart)
+#
+# As migrações são arquivos app/migrations/NNNN_descricao.py com `async def up(conn)`,
+# aplicados em ordem, cada um em uma transação junto com sua linha em schema_version.
+# Um advisory lock garante que só uma instância migra; com o schema em dia o boot
+# faz uma única consulta de versão.
+import argparse
+import asyncio
+import importlib
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+from asyncpg.exceptions import UndefinedTableError
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = "app.migrations"
+MIGRATIONS_DIR = Path(__file__).with_name("migrations")
+MIGRATION_PATTERN = re.compile(r"^(\d{4})_(\w+)\.py$")
+MIGRATIONS_LOCK_KEY = "schema_migrations"
+
+CREATE_SCHEMA_VERSION = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        duration_ms INTEGER NOT NULL
+    )
+'''
+
+# Versão + o que o storage precisa saber do schema, em um round trip só
+SCHEMA_STATE = '''
+    SELECT
+        (SELECT COALESCE(MAX(version), 0) FROM schema_version) AS version,
+        EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS trigram,
+        EXISTS (
+            SELECT 1 FROM pg_class
+            WHERE relname = 'conversations' AND relkind = 'p' AND pg_table_is_visible(oid)
+        ) AS partitioned
+'''
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    module: str
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """Arquivos de migração em ordem; as versões precisam ser 1, 2, 3... sem buracos"""
+    migrations = []
+    for path in directory.iterdir():
+        match = MIGRATION_PATTERN.match(path.name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), f"{MIGRATIONS_PACKAGE}.{path.stem}"))
+    migrations.sort()
+    for expected, migration in enumerate(migrations, start=1):
+        if migration.version != expected:
+            raise RuntimeError(f"Migração {expected:04d} ausente (encontrada {migration.version:04d}_{migration.name})")
+    return migrations
+
+
+async def schema_state(conn) -> Dict:
+    """Versão aplicada (0 se nunca migrado), pg_trgm instalado e conversations particionada"""
+    try:
+        row = await conn.fetchrow(SCHEMA_STATE)
+    except UndefinedTableError:
+        return {"version": 0, "trigram": False, "partitioned": False}
+    return dict(row)
+
+
+async def migrate(conn, migrations: List[Migration]) -> List[Migration]:
+    """Aplica as migrações pendentes sob o advisory lock; devolve as aplicadas"""
+    applied = []
+    await conn.execute('SELECT pg_advisory_lock(hashtext($1))', MIGRATIONS_LOCK_KEY)
+    try:
+        await conn.execute(CREATE_SCHEMA_VERSION)
+        # Outra instância pode ter migrado enquanto esperávamos o lock
+        current = await conn.fetchval('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+        for migration in migrations:
+            if migration.version <= current:
+                continue
+            module = importlib.import_module(migration.module)
+            started = time.perf_counter()
+            async with conn.transaction():
+                await module.up(conn)
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                await conn.execute(
+                    'INSERT INTO schema_version (version, name, duration_ms) VALUES ($1, $2, $3)',
+                    migration.version, migration.name, duration_ms,
+                )
+            logger.info("Migração %04d_%s aplicada em %d ms", migration.version, migration.name, duration_ms)
+            applied.append(migration)
+    finally:
+        await conn.execute('SELECT pg_advisory_unlock(hashtext($1))', MIGRATIONS_LOCK_KEY)
+    return applied
+
+
+async def ensure_schema(conn, auto_migrate: bool = True) -> Dict:
+    """Checagem de boot: schema em dia custa uma consulta; pendências são aplicadas
+    (ou recusadas com SCHEMA_AUTO_MIGRATE=false)"""
+    migrations = discover_migrations()
+    latest = migrations[-1].version if migrations else 0
+    state = await schema_state(conn)
+    if state["version"] == latest:
+        return state
+    if state["version"] > latest:
+        # Banco migrado por uma versão mais nova do código (rolling deploy em andamento)
+        logger.warning("Schema na versão %d, acima da conhecida por este código (%d)", state["version"], latest)
+        return state
+    if not auto_migrate:
+        raise RuntimeError(
+            f"Schema na versão {state['version']}, código espera {latest}: rode `python -m app.schema migrate`"
+        )
+    await migrate(conn, migrations)
+    return await schema_state(conn)
+
+
+async def _run_command(args):
+    from app.main import close_db_pool, get_db_pool
+
+    pool = await get_db_pool()
+    try:
+        migrations = discover_migrations()
+        async with pool.acquire() as conn:
+            if args.command == "status":
+                state = await schema_state(conn)
+                print(f"Versão do banco: {state['version']} (código: {migrations[-1].version if migrations else 0})")
+                for migration in migrations:
+                    mark = "✅" if migration.version <= state["version"] else "⏳"
+                    print(f"  {mark} {migration.version:04d}_{migration.name}")
+            elif args.command == "migrate":
+                applied = await migrate(conn, migrations)
+                for migration in applied:
+                    print(f"✅ {migration.version:04d}_{migration.name}")
+                print(f"✅ {len(applied)} migrações aplicadas" if applied else "✅ Schema já está em dia")
+    finally:
+        await close_db_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações do schema PostgreSQL Previdas")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("status", help="versão aplicada e migrações pendentes")
+    sub.add_parser("migrate", help="aplica as migrações pendentes")
+    args = parser.parse_args()
+
+    if args.command:
+        asyncio.run(_run_command(args))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# ==================== SCORING E RESPOSTAS (LÓGICA PURA, SEM BANCO NEM OPENAI) ====================
+import logging
+import re
+from typing import Dict, NamedTuple
+
+from app.keywords import MessageFeatures
+from app.logging_setup import TRACE_LOGGER
+
+logger = logging.getLogger(__name__)
+scoring_log = logging.getLogger(TRACE_LOGGER)
+
+_NON_DIGITS = re.compile(r'[^\d]')
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Normaliza telefones para formato único - SOLUÇÃO PARA DUPLICAÇÃO
+
+    Exemplos:
+    - "+31 619 255 082" → "619255082"
+    - "(31) 61925-5082" → "619255082"
+    - "31619255082" → "619255082"
+    """
+    if not phone:
+        return ""
+
+    # Remove TODOS os caracteres não numéricos
+    clean = _NON_DIGITS.sub('', str(phone))
+
+    # Remove código do país Holanda (31) se presente
+    if clean.startswith('31') and len(clean) > 10:
+        clean = clean[2:]
+
+    # Remove zeros à esquerda se existirem
+    clean = clean.lstrip('0')
+
+    logger.debug("Telefone normalizado: %r → %r", phone, clean)
+    return clean
+
+
+def fallback_analysis(features: MessageFeatures) -> Dict:
+    """Análise por palavras-chave usada quando a OpenAI não está disponível"""
+    score = 20  # Score base mais alto
+
+    # PRODUTOS ESPECÍFICOS (prioridade máxima)
+    if features.has("bpc"):
+        score += 30  # BPC é produto específico
+    if features.has("laudo", "perícia"):
+        score += 30  # Produto direto
+    if features.has("previdenciário", "trabalhista"):
+        score += 25  # Especialidade específica
+
+    # IDENTIFICAÇÃO PROFISSIONAL
+    if features.has("advogado"):
+        score += 40  # Profissão target
+        if features.has("especialista", "especializado"):
+            score += 20  # Advogado especialista
+    if features.has("escritório", "casos", "clientes"):
+        score += 25  # Contexto profissional
+
+    # URGÊNCIA E NECESSIDADE
+    if features.has("preciso", "necessito"):
+        score += 15  # Demonstra necessidade
+    if features.has("urgente"):
+        score += 20  # Urgência
+    if features.has("hoje", "amanhã", "audiência"):
+        score += 15  # Urgência contextual
+
+    # PENALIZAÇÕES REDUZIDAS
+    if features.length < 8:
+        score -= 5  # Penalização menor para mensagens curtas
+
+    if features.is_greeting:
+        score = 15  # Cumprimento básico
+
+    # Determinar intenção baseada no score E conteúdo
+    if features.has("advogado") or score >= 70:
+        intent = "lawyer"
+    elif features.has("laudo", "bpc", "perícia"):
+        intent = "product_inquiry"
+    elif features.has("preço", "valor", "custo"):
+        intent = "price_inquiry"
+    elif score >= 40:
+        intent = "unclear"
+    else:
+        intent = "casual"
+
+    return {
+        "intent": intent,
+        "urgency": "high" if features.has("urgente", "hoje", "amanhã") else "medium" if score >= 50 else "low",
+        "score": max(10, min(100, score)),  # Mínimo de 10 pontos
+        "next_action": "transfer_sales" if score >= 75 else "nurture" if score >= 50 else "qualify_more",
+        "sentiment": "positive" if score >= 60 else "neutral"
+    }
+
+
+class ScoreDecision(NamedTuple):
+    score: int
+    status: str  # "qualified" | "warm" | "cold"
+
+
+def score_message(current_score: int, current_status: str, analysis: Dict,
+                  features: MessageFeatures) -> ScoreDecision:
+    """Novo score e status do lead a partir do estado atual e da análise da mensagem"""
+    ai_score = analysis["score"]
+
+    # PALAVRAS-CHAVE QUE INDICAM QUALIDADE (listas em app/keywords.py)
+    has_product_keywords = features.has_product
+    has_professional_keywords = features.has_professional
+    has_urgency_keywords = features.has_urgency
+
+    # NOVA LÓGICA DE SCORING (SEM DECAY DESNECESSÁRIO)
+    if has_product_keywords or has_professional_keywords:
+        # Mensagem sobre produtos ou identificação profissional = SEMPRE melhora score
+        new_score = max(current_score, ai_score, 70)  # Mínimo 70 para produtos específicos
+        scoring_log.debug("PRODUTO/PROFISSIONAL mencionado - Score garantido: %s", new_score)
+
+    elif ai_score >= 60:
+        # Mensagem boa - mantém o melhor score
+        new_score = max(current_score, ai_score)
+        scoring_log.debug("Mensagem BOA - Score: %s", new_score)
+
+    elif ai_score >= 40:
+        # Mensagem neutra - score ponderado suave
+        new_score = int((current_score * 0.85) + (ai_score * 0.15))
+        scoring_log.debug("Mensagem NEUTRA - Score ponderado: %s", new_score)
+
+    else:
+        # Mensagem ruim - decay muito limitado
+        if features.length < 6 and not features.has("oi", "olá", "hey"):
+            # Apenas mensagens muito ruins e curtas recebem decay
+            new_score = max(current_score - 10, current_score * 0.9, 20)  # Redução máxima de 10 pontos
+            scoring_log.debug("Mensagem RUIM - Decay limitado: %s", new_score)
+        else:
+            # Cumprimentos normais não recebem penalização
+            new_score = current_score
+            scoring_log.debug("Cumprimento/Mensagem normal - Score mantido: %s", new_score)
+
+    # Garantir limites
+    new_score = max(10, min(100, int(new_score)))
+
+    scoring_log.debug("Resultado final: %s → %s (IA: %s)", current_score, new_score, ai_score)
+
+    # 4. LÓGICA DE QUALIFICAÇÃO COM CONTEXTO HISTÓRICO (CORREÇÃO FINAL)
+    has_quality_keywords = has_product_keywords or has_professional_keywords or has_urgency_keywords
+
+    scoring_log.debug("Keywords: Produto=%s, Profissional=%s, Urgência=%s",
+                      has_product_keywords, has_professional_keywords, has_urgency_keywords)
+
+    # VERIFICAR CONTEXTO HISTÓRICO PRIMEIRO (PRIORIDADE MÁXIMA)
+    already_qualified = current_status == "qualified"
+    has_high_historical_score = new_score >= 80
+
+    # LÓGICA CORRIGIDA: CONTEXTO HISTÓRICO TEM PRIORIDADE ABSOLUTA
+    if already_qualified and ai_score >= 20:
+        # Lead já qualificado + mensagem não muito negativa = MANTER QUALIFICAÇÃO
+        final_status = "qualified"
+        scoring_log.debug("Lead qualificado MANTIDO (contexto histórico: %s)", current_status)
+
+    elif has_high_historical_score and ai_score >= 30:
+        # Lead com score alto histórico + mensagem não muito negativa = RE-QUALIFICAR
+        final_status = "qualified"
+        scoring_log.debug("Lead RE-QUALIFICADO por score histórico alto (%s)", new_score)
+
+    else:
+        # APENAS AQUI aplicar lógica normal para leads novos ou com score baixo
+        is_hot_lead = (
+            new_score >= 75 and
+            (has_quality_keywords or analysis["intent"] in ["lawyer", "product_inquiry"]) and
+            features.length > 5
+        )
+
+        if is_hot_lead:
+            final_status = "qualified"
+            scoring_log.debug("Lead NOVA qualificação! Score: %s", new_score)
+        elif new_score >= 50 and has_quality_keywords:
+            final_status = "warm"
+            scoring_log.debug("Lead morno - nutrição")
+        else:
+            final_status = "cold"
+            scoring_log.debug("Lead frio - qualificação")
+
+    # ✅ CORREÇÃO ADICIONAL: GARANTIR QUE CONTEXTO HISTÓRICO SEJA SEMPRE RESPEITADO
+    if current_status == "qualified" and new_score >= 75:
+        if final_status != "qualified":
+            final_status = "qualified"
+            scoring_log.debug("CORREÇÃO FINAL: Contexto histórico recuperado! Status: qualified")
+
+    # Debug do status final
+    scoring_log.debug("Status final confirmado: %s", final_status)
+    return ScoreDecision(new_score, final_status)
+
+
+# ==================== RESPOSTAS POR STATUS ====================
+def sales_reply(features: MessageFeatures, score: int, status: str) -> str:
+    """Resposta ESPECÍFICA para leads qualificados"""
+
+    # VERIFICAR SE É LEAD JÁ CONHECIDO COM SCORE ALTO
+    is_known_lead = score >= 75 or status == "qualified"
+
+    if is_known_lead:
+        # RESPOSTAS CONTEXTUAIS PARA LEADS CONHECIDOS
+        if features.has("seguro"):
+            return "Olá! Somos especializados em laudos médicos, não seguros. Mas posso ajudar com laudos para seus processos previdenciários. Precisa de algum laudo médico?"
+        elif features.has("banco", "empréstimo", "financiamento"):
+            return "Olá! Nossa especialidade são laudos médicos para processos jurídicos. Como posso ajudar com laudos para seus casos?"
+        elif features.has("curso", "treinamento", "capacitação"):
+            return "Olá! Somos especialistas em laudos médicos, não cursos. Mas posso ajudar com laudos para seus processos. Tem algum caso pendente?"
+
+    # Respostas específicas para produtos mencionados
+    if features.has("bpc"):
+        if features.has("urgente"):
+            return "Especialistas em BPC urgente! Emitimos laudos em 6h. Qual o prazo da audiência?"
+        else:
+            return "Perfeito! Somos especialistas em laudos BPC. Qual o CID do seu cliente?"
+
+    elif features.has("laudo"):
+        if features.has("previdenciário", "trabalhista"):
+            return "Especialistas nessa área! Quantos laudos você precisa por mês?"
+        else:
+            return "Fazemos laudos médicos especializados. Qual área: previdenciário, trabalhista ou civil?"
+
+    elif features.has("advogado"):
+        return "Perfeito! Ajudamos advogados com laudos médicos há 10 anos. Qual sua especialidade?"
+
+    else:
+        # Resposta padrão para leads qualificados
+        return "Vou conectar você com nosso especialista imediatamente. Qual o melhor horário para contato?"
+
+
+def nurture_reply(features: MessageFeatures, score: int) -> str:
+    """Resposta de nutrição para leads mornos"""
+
+    # Se lead tem score alto mas não foi qualificado, ser mais direto
+    if score >= 70:
+        if features.has("seguro"):
+            return "Entendi! Não trabalhamos com seguros, mas somos especialistas em laudos médicos para advogados. Você atua na área jurídica?"
+        elif features.has("bpc", "previdenciário"):
+            return "Somos especialistas em BPC! Nossos laudos têm 95% de aprovação. Conectando com nosso especialista..."
+        else:
+            return "Entendo! Somos a Previdas, especialistas em laudos médicos para advogados. Vou conectar você com nossa equipe especializada."
+
+    # Respostas normais de nutrição
+    if features.has("bpc", "previdenciário"):
+        return "Somos especialistas em BPC! Nossos laudos têm 95% de aprovação. Você é advogado?"
+    elif features.has("laudo"):
+        return "Fazemos laudos médicos para processos jurídicos. Qual sua área de atuação?"
+    elif features.has("trabalham") and features.has("que"):
+        return "Laudos médicos especializados para advogados. Você atua com previdenciário ou trabalhista?"
+    elif features.has("preço", "valor"):
+        return "Nossos valores são competitivos. Você trabalha com quantos casos por mês?"
+    else:
+        return "Entendi. Somos especialistas em laudos médicos para advogados. Qual sua área?"
+
+
+def qualification_reply(features: MessageFeatures, score: int) -> str:
+    """Resposta de qualificação para leads frios"""
+
+    # Se é lead com algum score mas mensagem fora do contexto
+    if score >= 50:
+        if features.has("seguro"):
+            return "Olá! Nossa especialidade são laudos médicos para advogados, não seguros. Você trabalha com direito?"
+        elif features.has("banco", "empréstimo", "investimento"):
+            return "Olá! Somos especializados em laudos médicos para processos jurídicos. Você é advogado?"
+
+    # Respostas normais de qualificação
+    if features.has("trabalham") and features.has("que"):
+        return "Fazemos laudos médicos para processos jurídicos. Você é advogado?"
+    elif features.length < 10:
+        return "Olá! Somos especialistas em laudos médicos para advogados. Qual sua profissão?"
+    else:
+        return "Entendido. Somos a Previdas, laudos médicos para advogados. Você atua na área jurídica?"
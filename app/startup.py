@@ -0,0 +1,166 @@
+# ==================== PERFIL DE COLD START ====================
+# Uso:
+#   python -m app.startup                                   importa app.main, roda o startup, serve /api/health e imprime o perfil
+#   python -m app.startup --check-startup [--budget-ms 3000]  idem, saindo com erro acima do orçamento
+#
+# Este módulo só usa a biblioteca padrão: é importado antes de FastAPI/asyncpg em
+# app/main.py para medir o próprio import do app.
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Orçamento padrão do --check-startup: do início do processo até a primeira resposta
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "3000"))
+
+
+def process_age_ms() -> Optional[float]:
+    """Tempo desde o início do processo (inclui o boot do interpretador); None fora do Linux"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Campo 22 (starttime, em ticks desde o boot); o nome do processo pode ter espaços
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(0.0, (uptime - started_ticks / os.sysconf("SC_CLK_TCK")) * 1000)
+
+
+class StartupProfile:
+    """Fases do startup em ms (imports, configuração, lifespan) e tempo até a primeira
+    resposta servida, a partir do início do processo quando disponível"""
+
+    def __init__(self):
+        self._started = self._last = time.perf_counter()
+        self.before_ms = process_age_ms()  # interpretador + imports anteriores ao app.main
+        self.phases: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self.first_request_ms: Optional[float] = None
+        self.first_request_path: Optional[str] = None
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000 + (self.before_ms or 0.0)
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+    def ready(self):
+        """Fim do startup do lifespan: a partir daqui o servidor aceita requisições"""
+        self.mark("lifespan")
+        self.ready_ms = round(self._elapsed_ms(), 2)
+
+    def request_served(self, path: str) -> bool:
+        """Registra a primeira resposta; True só na primeira chamada"""
+        if self.first_request_ms is not None:
+            return False
+        self.first_request_ms = round(self._elapsed_ms(), 2)
+        self.first_request_path = path
+        return True
+
+    def report(self) -> Dict:
+        return {
+            "process_before_app_ms": round(self.before_ms, 2) if self.before_ms is not None else None,
+            "phases_ms": self.phases,
+            "ready_ms": self.ready_ms,
+            "first_request_ms": self.first_request_ms,
+            "first_request_path": self.first_request_path,
+        }
+
+
+class LazyClient:
+    """Proxy que constrói o cliente (e importa sua biblioteca) no primeiro acesso a
+    atributo; `load()` permite aquecer fora do caminho da requisição"""
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    @property
+    def loaded(self) -> bool:
+        return self._client is not None
+
+    def __getattr__(self, name: str):
+        return getattr(self.load(), name)
+
+
+async def _serve_one(app, path: str) -> int:
+    """Uma requisição GET direto na interface ASGI (sem cliente HTTP no import)"""
+    status = 0
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()  # cliente nunca desconecta durante o teste
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"startup-check")], "client": ("127.0.0.1", 0), "server": ("startup-check", 80),
+    }
+    await app(scope, receive, send)
+    return status
+
+
+async def _profile_startup(path: str) -> Dict:
+    main = importlib.import_module("app.main")
+    async with main.app.router.lifespan_context(main.app):
+        status = await _serve_one(main.app, path)
+        report = main.startup_profile.report()
+    report["status"] = status
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de cold start do Previdas Automation Engine")
+    parser.add_argument("--check-startup", action="store_true", help="falha se a primeira resposta passar do orçamento")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="orçamento em ms do início do processo à primeira resposta (padrão: STARTUP_BUDGET_MS)")
+    parser.add_argument("--path", default="/api/health", help="rota da primeira requisição")
+    parser.add_argument("--json", action="store_true", help="relatório em JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(_profile_startup(args.path))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        if report["process_before_app_ms"] is not None:
+            print(f"  {'processo (antes do app)':<28} {report['process_before_app_ms']:>9.1f} ms")
+        for phase, elapsed in report["phases_ms"].items():
+            print(f"  {phase:<28} {elapsed:>9.1f} ms")
+        print(f"Pronto para requisições: {report['ready_ms']:.1f} ms")
+        print(f"Primeira resposta ({report['first_request_path']} → {report['status']}): "
+              f"{report['first_request_ms']:.1f} ms")
+
+    if args.check_startup:
+        if report["status"] >= 500 or report["first_request_ms"] is None:
+            raise SystemExit(f"❌ Primeira requisição falhou (HTTP {report['status']})")
+        if report["first_request_ms"] > args.budget_ms:
+            raise SystemExit(f"❌ Startup de {report['first_request_ms']:.1f} ms acima do orçamento de {args.budget_ms:.0f} ms")
+        print(f"✅ Startup dentro do orçamento ({args.budget_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
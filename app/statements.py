@@ -0,0 +1,153 @@
+# ==================== PREPARED STATEMENTS POR CONEXÃO DO POOL ====================
+# As queries do caminho quente são registradas por nome e preparadas uma vez por
+# conexão (hook `init` do pool); a execução usa o handle, sem reenviar o texto
+# nem consultar o cache LRU do asyncpg. PREPARED_STATEMENTS=false volta ao texto
+# (necessário atrás de pgbouncer em modo transaction).
+import hashlib
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import asyncpg
+from asyncpg.exceptions import InvalidCachedStatementError, OutdatedSchemaCacheError
+
+logger = logging.getLogger(__name__)
+
+# SQL montado em tempo de execução (ex.: busca de leads) vira statement por variante;
+# acima do limite as variantes novas seguem como texto
+MAX_DYNAMIC_STATEMENTS = 64
+
+
+class PreparedConnection(asyncpg.Connection):
+    """Conexão do pool com os statements do registro (nome → PreparedStatement)"""
+    __slots__ = ("prepared",)
+
+
+class StatementRegistry:
+    """Registro nome → SQL com preparo por conexão e contagem do parse/plan evitado.
+
+    O tempo economizado é estimado pela média de `conn.prepare()` de cada statement
+    (medida nas próprias conexões) vezes as execuções feitas pelo handle.
+    """
+
+    def __init__(self, enabled: bool = True, saved_counter=None, name: str = "statements"):
+        self.enabled = enabled
+        self.saved_counter = saved_counter
+        self.name = name
+        self._sql: Dict[str, str] = {}
+        self._dynamic: Dict[str, str] = {}
+        self._prepare_time: Dict[str, Tuple[float, int]] = {}
+        self.prepared = 0
+        self.deferred = 0
+        self.reprepared = 0
+        self.executions = 0
+        self.text_executions = 0
+        self.saved_seconds = 0.0
+
+    def register(self, name: str, sql: str) -> str:
+        if self._sql.get(name, sql) != sql:
+            raise ValueError(f"Statement {name!r} já registrado com outro SQL")
+        self._sql[name] = sql
+        return name
+
+    def dynamic(self, sql: str) -> Optional[str]:
+        """Nome do statement para um SQL montado dinamicamente (None acima do limite)"""
+        name = self._dynamic.get(sql)
+        if name is None:
+            if len(self._dynamic) >= MAX_DYNAMIC_STATEMENTS:
+                return None
+            digest = hashlib.sha1(sql.encode("utf-8")).hexdigest()[:12]
+            name = self._dynamic[sql] = self.register(f"dynamic_{digest}", sql)
+        return name
+
+    async def setup_connection(self, conn):
+        """Hook `init` do pool: prepara tudo o que já foi registrado nesta conexão.
+
+        No primeiro boot as tabelas ainda não existem quando o pool abre; esses
+        statements são preparados no primeiro uso.
+        """
+        conn.prepared = {}
+        if not self.enabled:
+            return
+        for name in list(self._sql):
+            try:
+                await self._prepare(conn, name)
+            except asyncpg.PostgresError as e:
+                self.deferred += 1
+                logger.debug("Statement %s adiado para o primeiro uso: %s", name, e)
+
+    async def _prepare(self, conn, name: str):
+        started = time.perf_counter()
+        statement = await conn.prepare(self._sql[name])
+        elapsed = time.perf_counter() - started
+        total, count = self._prepare_time.get(name, (0.0, 0))
+        self._prepare_time[name] = (total + elapsed, count + 1)
+        conn.prepared[name] = statement
+        self.prepared += 1
+        return statement
+
+    async def _run(self, conn, method: str, name: str, args):
+        prepared = getattr(conn, "prepared", None) if self.enabled else None
+        if prepared is None:
+            # Desligado ou conexão fora do pool registrado: texto (cache LRU do asyncpg)
+            self.text_executions += 1
+            return await getattr(conn, method)(self._sql[name], *args)
+
+        statement = prepared.get(name) or await self._prepare(conn, name)
+        try:
+            result = await getattr(statement, method)(*args)
+        except (InvalidCachedStatementError, OutdatedSchemaCacheError):
+            # Schema mudou (ex.: ALTER TABLE): prepara de novo e repete uma vez
+            self.reprepared += 1
+            statement = await self._prepare(conn, name)
+            result = await getattr(statement, method)(*args)
+
+        total, count = self._prepare_time[name]
+        saved = total / count
+        self.executions += 1
+        self.saved_seconds += saved
+        if self.saved_counter is not None:
+            # Variantes dinâmicas somadas em um label só (cardinalidade baixa no Prometheus)
+            self.saved_counter.inc(saved, statement="dynamic" if name.startswith("dynamic_") else name)
+        return result
+
+    async def fetch(self, conn, name: str, *args):
+        return await self._run(conn, "fetch", name, args)
+
+    async def fetchrow(self, conn, name: str, *args):
+        return await self._run(conn, "fetchrow", name, args)
+
+    async def fetchval(self, conn, name: str, *args):
+        return await self._run(conn, "fetchval", name, args)
+
+    async def execute(self, conn, name: str, *args):
+        """Statement sem retorno (INSERT/UPDATE); pelo handle equivale a um fetch vazio"""
+        if not self.enabled or getattr(conn, "prepared", None) is None:
+            self.text_executions += 1
+            return await conn.execute(self._sql[name], *args)
+        return await self._run(conn, "fetch", name, args)
+
+    async def fetch_sql(self, conn, sql: str, *args):
+        """fetch de SQL dinâmico: statement por variante enquanto couber no limite"""
+        name = self.dynamic(sql)
+        if name is None:
+            self.text_executions += 1
+            return await conn.fetch(sql, *args)
+        return await self.fetch(conn, name, *args)
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "registered": len(self._sql),
+            "dynamic": len(self._dynamic),
+            "prepared": self.prepared,
+            "deferred": self.deferred,
+            "reprepared": self.reprepared,
+            "executions": self.executions,
+            "text_executions": self.text_executions,
+            "saved_ms": round(self.saved_seconds * 1000, 2),
+            "prepare_ms": {
+                name: round(total / count * 1000, 3) for name, (total, count) in sorted(self._prepare_time.items())
+            },
+        }
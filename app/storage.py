@@ -0,0 +1,910 @@
+# ==================== PERSISTÊNCIA: POSTGRESQL, SQLITE OU MEMÓRIA ====================
+# STORAGE_BACKEND=postgres (padrão, produção) | sqlite (instalações pequenas, requer
+# aiosqlite) | memory (testes de carga/benchmark do engine sem banco).
+# Recursos que dependem do PostgreSQL (partições, importação com COPY, exportação com
+# cursor no servidor, fila durável, LISTEN/NOTIFY) continuam só no backend postgres.
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.history import HISTORY_QUERIES, MAX_HISTORY_PAGE, history_page
+from app.jobs import enqueue_jobs
+from app.lead_search import (
+    LEAD_PAGE_COLUMNS, MAX_PAGE_SIZE, decode_cursor, encode_cursor, lead_statuses, search_leads
+)
+from app.log_sink import LOG_COLUMNS
+from app.rollup import fetch_rollup, score_bucket
+from app.schema import ensure_schema
+from app.statements import StatementRegistry
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKENDS = ("postgres", "sqlite", "memory")
+
+LEAD_COLUMNS = ("phone", "name", "status", "score", "source")
+HOT_LEAD_SCORE = 75
+
+# Round trips ao banco na mensagem em processamento (lista de 1 contador por contexto)
+db_round_trips: ContextVar[Optional[List[int]]] = ContextVar("db_round_trips", default=None)
+
+
+def count_round_trips(n: int = 1):
+    """Contabiliza round trips ao banco na mensagem em processamento (no-op fora dela)"""
+    counter = db_round_trips.get()
+    if counter is not None:
+        counter[0] += n
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Storage:
+    """Repositório de leads, conversas, logs de automação e analytics.
+
+    Linhas de lead são dicts com LEAD_COLUMNS; upsert_lead/persist_message_exchange
+    devolvem também `inserted`, `previous_status` e `previous_score` (delta do dashboard).
+    Históricos vêm do mais recente para o mais antigo.
+    """
+    name = ""
+    search_mode = "scan"   # busca de leads: trigram/ilike (PostgreSQL), like (SQLite)
+    partitioned = False    # conversations particionada por mês (só PostgreSQL)
+
+    async def init(self):
+        """Cria tabelas/índices (idempotente)"""
+
+    async def close(self):
+        pass
+
+    async def ping(self) -> Dict:
+        raise NotImplementedError
+
+    # Leads
+    async def get_lead(self, phone: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def get_lead_detail(self, phone: str) -> Optional[Dict]:
+        """Todas as colunas do lead (id, created_at, updated_at...)"""
+        raise NotImplementedError
+
+    async def upsert_lead(self, lead: Dict) -> Dict:
+        raise NotImplementedError
+
+    async def delete_lead(self, lead_id: int) -> Optional[Dict]:
+        """Remove o lead e suas conversas; devolve phone, status e score (None se não existe)"""
+        raise NotImplementedError
+
+    async def search_leads(self, status: Optional[str] = None, search: Optional[str] = None,
+                           cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict], Optional[str]]:
+        """Página por (updated_at, id) decrescente + cursor da próxima (ValueError se cursor inválido)"""
+        raise NotImplementedError
+
+    async def lead_statuses(self) -> List[str]:
+        raise NotImplementedError
+
+    # Conversas
+    async def recent_history(self, phone: str, since: datetime, limit: int = 10) -> List[Dict]:
+        raise NotImplementedError
+
+    async def load_message_context(self, phone: str, since: datetime) -> Tuple[Optional[Dict], List[Dict]]:
+        """Lead (None se não existe) + últimas 10 mensagens"""
+        return await self.get_lead(phone), await self.recent_history(phone, since)
+
+    async def save_conversation(self, phone: str, message: str, is_bot: bool):
+        """Grava uma mensagem, criando um lead básico se ainda não existir"""
+        raise NotImplementedError
+
+    async def save_inbound_messages(self, messages: List[Dict]) -> List[Dict]:
+        """Grava mensagens recebidas em ordem; devolve os leads criados"""
+        raise NotImplementedError
+
+    async def persist_message_exchange(self, lead: Dict, message: Optional[str], bot_response: str) -> Dict:
+        """Upsert do lead + mensagem (se não gravada ainda) + resposta, de forma atômica"""
+        raise NotImplementedError
+
+    async def history_page(self, table: str, phone: str, before: Optional[str] = None,
+                           limit: int = 50) -> Tuple[List[Dict], Optional[str]]:
+        """Página de `conversations` ou `automation_logs` + cursor da anterior"""
+        raise NotImplementedError
+
+    # Logs de automação (tuplas na ordem de LOG_COLUMNS)
+    async def write_logs(self, records: Sequence[Tuple]):
+        raise NotImplementedError
+
+    # Analytics
+    async def rollup_rows(self) -> List[Dict]:
+        """Linhas (status, bucket, lead_count, score_sum) para summarize_rollup"""
+        raise NotImplementedError
+
+    async def hot_leads(self, limit: int = 20) -> List[Dict]:
+        raise NotImplementedError
+
+    async def stats(self) -> Dict:
+        raise NotImplementedError
+
+
+# ==================== POSTGRESQL (ASYNCPG) ====================
+# Queries do caminho quente, preparadas uma vez por conexão (app/statements.py)
+PG_STATEMENTS = {
+    "lead_by_phone": 'SELECT phone, name, status, score, source FROM leads WHERE phone = $1',
+    # `previous` lê o snapshot anterior ao upsert: delta exato para o dashboard
+    "lead_upsert": '''
+        WITH previous AS (
+            SELECT status, score FROM leads WHERE phone = $1
+        )
+        INSERT INTO leads (phone, name, status, score, source, updated_at)
+        VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP)
+        ON CONFLICT (phone)
+        DO UPDATE SET
+            name = COALESCE(EXCLUDED.name, leads.name),
+            status = EXCLUDED.status,
+            score = EXCLUDED.score,
+            source = COALESCE(EXCLUDED.source, leads.source),
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING phone, name, status, score, source, (xmax = 0) AS inserted,
+            (SELECT status FROM previous) AS previous_status,
+            (SELECT score FROM previous) AS previous_score
+    ''',
+    "lead_exists": 'SELECT EXISTS(SELECT 1 FROM leads WHERE phone = $1)',
+    "lead_ensure": 'INSERT INTO leads (phone, status, score) VALUES ($1, $2, $3) ON CONFLICT (phone) DO NOTHING',
+    # Limite em timestamp: só as partições mais recentes entram no plano
+    "recent_history": (
+        'SELECT message, is_bot FROM conversations WHERE phone = $1 AND timestamp >= $2 '
+        'ORDER BY timestamp DESC LIMIT $3'
+    ),
+    "message_context": '''
+        SELECT l.phone IS NOT NULL AS found, l.name, l.status, l.score, l.source,
+               COALESCE((
+                   SELECT json_agg(json_build_object('message', h.message, 'is_bot', h.is_bot))
+                   FROM (
+                       SELECT message, is_bot FROM conversations
+                       WHERE phone = p.phone AND timestamp >= $2
+                       ORDER BY timestamp DESC LIMIT 10
+                   ) h
+               ), '[]') AS history
+        FROM (SELECT $1::varchar AS phone) p
+        LEFT JOIN leads l ON l.phone = p.phone
+    ''',
+    "conversation_insert": 'INSERT INTO conversations (phone, message, is_bot) VALUES ($1, $2, $3)',
+    # Ordinalidade no timestamp mantém a ordem de chegada dentro do lote
+    "inbound_messages": '''
+        WITH input AS (
+            SELECT * FROM unnest($1::varchar[], $2::text[], $3::varchar[])
+                WITH ORDINALITY AS t(phone, message, name, ord)
+        ), new_leads AS (
+            INSERT INTO leads (phone, name, status, score)
+            SELECT DISTINCT ON (phone) phone, name, 'new', 0 FROM input ORDER BY phone, ord
+            ON CONFLICT (phone) DO NOTHING
+            RETURNING phone, name, status, score
+        ), saved AS (
+            INSERT INTO conversations (phone, message, is_bot, timestamp)
+            SELECT phone, message, FALSE, CURRENT_TIMESTAMP + ord * INTERVAL '1 microsecond'
+            FROM input
+            ORDER BY ord
+        )
+        SELECT phone, name, status, score FROM new_leads
+    ''',
+    # Um único statement = uma única transação implícita. A resposta recebe
+    # timestamp 1µs depois para manter a ordem mensagem → resposta.
+    "message_exchange": '''
+        WITH previous AS (
+            SELECT status, score FROM leads WHERE phone = $1
+        ), lead AS (
+            INSERT INTO leads (phone, name, status, score, source, updated_at)
+            VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP)
+            ON CONFLICT (phone)
+            DO UPDATE SET
+                name = COALESCE(EXCLUDED.name, leads.name),
+                status = EXCLUDED.status,
+                score = EXCLUDED.score,
+                source = COALESCE(EXCLUDED.source, leads.source),
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING phone, name, status, score, source, (xmax = 0) AS inserted
+        ), conversation AS (
+            INSERT INTO conversations (phone, message, is_bot, timestamp)
+            SELECT lead.phone, v.message, v.is_bot, v.ts
+            FROM lead, (VALUES
+                ($6::text, FALSE, CURRENT_TIMESTAMP),
+                ($7::text, TRUE, CURRENT_TIMESTAMP + INTERVAL '1 microsecond')
+            ) AS v(message, is_bot, ts)
+            WHERE v.message IS NOT NULL
+        )
+        SELECT lead.*, previous.status AS previous_status, previous.score AS previous_score
+        FROM lead LEFT JOIN previous ON TRUE
+    ''',
+    "automation_log_insert": (
+        f'INSERT INTO automation_logs ({", ".join(LOG_COLUMNS)}) VALUES ($1, $2, $3, $4, $5, $6)'
+    ),
+}
+
+
+class PostgresStorage(Storage):
+    name = "postgresql"
+
+    def __init__(self, pool_getter: Callable, statements: Optional[StatementRegistry] = None,
+                 auto_migrate: bool = True):
+        self.pool_getter = pool_getter
+        self.auto_migrate = auto_migrate
+        self.statements = statements or StatementRegistry(enabled=False)
+        for name, sql in PG_STATEMENTS.items():
+            self.statements.register(name, sql)
+        self.search_mode = "ilike"
+        self.partitioned = False
+
+    async def init(self):
+        """Schema versionado (app/migrations): em dia, o boot faz uma consulta só"""
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            state = await ensure_schema(conn, self.auto_migrate)
+        self.search_mode = "trigram" if state["trigram"] else "ilike"
+        self.partitioned = state["partitioned"]
+        if not self.partitioned:
+            logger.warning("conversations não é particionada; rode: python -m app.partitions migrate")
+
+    async def ping(self) -> Dict:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            result = await conn.fetchval("SELECT 1")
+        return {"test_query": result, "pool_status": f"{pool.in_use()}/{pool.get_max_size()} em uso"}
+
+    async def get_lead(self, phone: str) -> Optional[Dict]:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            count_round_trips()
+            row = await self.statements.fetchrow(conn, "lead_by_phone", phone)
+        return dict(row) if row else None
+
+    async def get_lead_detail(self, phone: str) -> Optional[Dict]:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow("SELECT * FROM leads WHERE phone = $1", phone)
+        return dict(row) if row else None
+
+    async def upsert_lead(self, lead: Dict) -> Dict:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            count_round_trips()
+            row = await self.statements.fetchrow(
+                conn, "lead_upsert", lead["phone"], lead.get("name"), lead["status"],
+                lead["score"], lead.get("source", "whatsapp")
+            )
+        return dict(row)
+
+    async def delete_lead(self, lead_id: int) -> Optional[Dict]:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            # PostgreSQL com CASCADE DELETE automático
+            row = await conn.fetchrow("DELETE FROM leads WHERE id = $1 RETURNING phone, status, score", lead_id)
+        return dict(row) if row else None
+
+    async def search_leads(self, status=None, search=None, cursor=None, limit=50):
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            return await search_leads(conn, status, search, cursor, limit, statements=self.statements)
+
+    async def lead_statuses(self) -> List[str]:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            return await lead_statuses(conn)
+
+    async def recent_history(self, phone: str, since: datetime, limit: int = 10) -> List[Dict]:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            count_round_trips()
+            rows = await self.statements.fetch(conn, "recent_history", phone, since, limit)
+        return [{"message": row['message'], "is_bot": bool(row['is_bot'])} for row in rows]
+
+    async def load_message_context(self, phone: str, since: datetime) -> Tuple[Optional[Dict], List[Dict]]:
+        """Fase de leitura em 1 round trip: dados do lead + últimas 10 mensagens"""
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            count_round_trips()
+            row = await self.statements.fetchrow(conn, "message_context", phone, since)
+
+        lead = None
+        if row['found']:
+            lead = {"phone": phone, "name": row['name'], "status": row['status'],
+                    "score": row['score'], "source": row['source']}
+        history = [
+            {"message": item["message"], "is_bot": bool(item["is_bot"])}
+            for item in json.loads(row['history'])
+        ]
+        return lead, history
+
+    async def save_conversation(self, phone: str, message: str, is_bot: bool):
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            # ✅ VERIFICAR SE LEAD EXISTE ANTES DE SALVAR CONVERSA
+            count_round_trips()
+            lead_exists = await self.statements.fetchval(conn, "lead_exists", phone)
+
+            if not lead_exists:
+                # Criar lead básico se não existir
+                count_round_trips()
+                await self.statements.execute(conn, "lead_ensure", phone, 'new', 0)
+
+            # Agora salvar conversa
+            count_round_trips()
+            await self.statements.execute(conn, "conversation_insert", phone, message, is_bot)
+
+    async def save_inbound_messages(self, messages: List[Dict]) -> List[Dict]:
+        """Grava mensagens recebidas em lote (1 round trip): cria leads faltantes e insere as conversas"""
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            count_round_trips()
+            new_leads = await self.statements.fetch(
+                conn, "inbound_messages", [m["phone"] for m in messages], [m["message"] for m in messages],
+                [m.get("name") for m in messages]
+            )
+        return [dict(lead) for lead in new_leads]
+
+    async def save_inbound_messages_with_jobs(self, messages: List[Dict], jobs: List[Tuple[str, Dict]],
+                                              max_attempts: int = 5) -> Tuple[List[Dict], List[int]]:
+        """Mensagens recebidas + seus jobs duráveis em uma transação (JOB_QUEUE_MODE=postgres):
+        nenhuma mensagem fica gravada sem job, e uma falha não deixa nada para o reenvio duplicar"""
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                count_round_trips(2)
+                new_leads = await self.statements.fetch(
+                    conn, "inbound_messages", [m["phone"] for m in messages], [m["message"] for m in messages],
+                    [m.get("name") for m in messages]
+                )
+                job_ids = await enqueue_jobs(conn, jobs, max_attempts)
+        return [dict(lead) for lead in new_leads], job_ids
+
+    async def persist_message_exchange(self, lead: Dict, message: Optional[str], bot_response: str) -> Dict:
+        """Fase de escrita em 1 round trip: upsert do lead, mensagem e resposta (atômico)"""
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            count_round_trips()
+            row = await self.statements.fetchrow(
+                conn, "message_exchange", lead["phone"], lead.get("name"), lead["status"], lead["score"],
+                lead.get("source", "whatsapp"), message, bot_response
+            )
+        return dict(row)
+
+    async def history_page(self, table, phone, before=None, limit=50):
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            return await history_page(conn, table, phone, before, limit)
+
+    async def write_logs(self, records: Sequence[Tuple]):
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            count_round_trips()
+            if len(records) == 1:
+                # Um log isolado (AUTOMATION_LOG_MODE=direct): INSERT é mais barato que COPY
+                await self.statements.execute(conn, "automation_log_insert", *records[0])
+            else:
+                await conn.copy_records_to_table("automation_logs", records=list(records), columns=LOG_COLUMNS)
+
+    async def rollup_rows(self) -> List[Dict]:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            # Contadores do rollup (O(status × faixas) linhas, independente do nº de leads)
+            return await fetch_rollup(conn)
+
+    async def hot_leads(self, limit: int = 20) -> List[Dict]:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            # Hot leads (query otimizada com índice)
+            rows = await conn.fetch("""
+                SELECT phone, name, score, updated_at
+                FROM leads
+                WHERE score >= 75
+                ORDER BY score DESC, updated_at DESC
+                LIMIT $1
+            """, limit)
+        return [dict(row) for row in rows]
+
+    async def stats(self) -> Dict:
+        pool = await self.pool_getter()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT
+                    (SELECT COUNT(*) FROM leads) as total_leads,
+                    (SELECT COUNT(*) FROM conversations) as total_messages,
+                    (SELECT COUNT(*) FROM automation_logs) as total_automations,
+                    (SELECT COUNT(*) FROM leads WHERE created_at > NOW() - INTERVAL '24 hours') as leads_today,
+                    (SELECT COUNT(*) FROM conversations WHERE timestamp > NOW() - INTERVAL '1 hour') as messages_last_hour
+            """)
+        return {**dict(row), "pool_status": f"Connected ({pool.in_use()}/{pool.get_max_size()} em uso)"}
+
+
+# ==================== MEMÓRIA (SEM BANCO) ====================
+class _Clock:
+    """Timestamps UTC estritamente crescentes (ordem de gravação = ordem de leitura)"""
+
+    def __init__(self):
+        self._last = datetime.min.replace(tzinfo=timezone.utc)
+
+    def now(self) -> datetime:
+        moment = _utcnow()
+        if moment <= self._last:
+            moment = self._last + timedelta(microseconds=1)
+        self._last = moment
+        return moment
+
+
+def _lead_upsert_result(lead: Dict, previous: Optional[Dict]) -> Dict:
+    return {
+        **{column: lead[column] for column in LEAD_COLUMNS},
+        "inserted": previous is None,
+        "previous_status": previous["status"] if previous else None,
+        "previous_score": previous["score"] if previous else None,
+    }
+
+
+def _page(items: List[Dict], limit: int, key: str) -> Tuple[List[Dict], Optional[str]]:
+    """Corta `limit` itens já ordenados e monta o cursor keyset (key, id) da próxima página"""
+    page = items[:limit]
+    next_cursor = encode_cursor(page[-1][key], page[-1]["id"]) if len(items) > limit else None
+    return page, next_cursor
+
+
+def _matches_search(lead: Dict, search: str, digits: str) -> bool:
+    return search.lower() in (lead["name"] or "").lower() or bool(digits and digits in lead["phone"])
+
+
+class MemoryStorage(Storage):
+    """Tudo em dicts do processo: some no restart. Para benchmark/teste do engine
+    (o custo medido é só o do Python) e desenvolvimento sem PostgreSQL."""
+    name = "memory"
+
+    def __init__(self):
+        self.leads: Dict[str, Dict] = {}
+        self.conversations: Dict[str, List[Dict]] = defaultdict(list)
+        self.logs: Dict[str, List[Dict]] = defaultdict(list)
+        self._clock = _Clock()
+        self._ids = {"leads": count(1), "conversations": count(1), "automation_logs": count(1)}
+
+    async def ping(self) -> Dict:
+        return {"test_query": 1, "pool_status": "n/a"}
+
+    async def get_lead(self, phone: str) -> Optional[Dict]:
+        lead = self.leads.get(phone)
+        return {column: lead[column] for column in LEAD_COLUMNS} if lead else None
+
+    async def get_lead_detail(self, phone: str) -> Optional[Dict]:
+        lead = self.leads.get(phone)
+        return dict(lead) if lead else None
+
+    def _insert_lead(self, phone: str, name: Optional[str] = None, status: str = "new", score: int = 0,
+                     source: Optional[str] = "whatsapp") -> Dict:
+        now = self._clock.now()
+        lead = self.leads[phone] = {
+            "id": next(self._ids["leads"]), "phone": phone, "name": name, "status": status,
+            "score": score, "source": source, "created_at": now, "updated_at": now,
+        }
+        return lead
+
+    def _upsert(self, data: Dict) -> Dict:
+        lead = self.leads.get(data["phone"])
+        previous = {"status": lead["status"], "score": lead["score"]} if lead else None
+        if lead is None:
+            lead = self._insert_lead(data["phone"], data.get("name"), data["status"], data["score"],
+                                     data.get("source", "whatsapp"))
+        else:
+            lead.update(
+                name=data.get("name") or lead["name"],
+                status=data["status"],
+                score=data["score"],
+                source=data.get("source", "whatsapp") or lead["source"],
+                updated_at=self._clock.now(),
+            )
+        return _lead_upsert_result(lead, previous)
+
+    async def upsert_lead(self, lead: Dict) -> Dict:
+        return self._upsert(lead)
+
+    async def delete_lead(self, lead_id: int) -> Optional[Dict]:
+        phone = next((phone for phone, lead in self.leads.items() if lead["id"] == lead_id), None)
+        if phone is None:
+            return None
+        lead = self.leads.pop(phone)
+        self.conversations.pop(phone, None)
+        return {"phone": phone, "status": lead["status"], "score": lead["score"]}
+
+    async def search_leads(self, status=None, search=None, cursor=None, limit=50):
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        search = (search or "").strip()
+        digits = "".join(ch for ch in search if ch.isdigit())
+        after = decode_cursor(cursor) if cursor else None
+        leads = [
+            {column: lead[column] for column in LEAD_PAGE_COLUMNS}
+            for lead in self.leads.values()
+            if (not status or lead["status"] == status)
+            and (not search or _matches_search(lead, search, digits))
+            and (after is None or (lead["updated_at"], lead["id"]) < after)
+        ]
+        leads.sort(key=lambda lead: (lead["updated_at"], lead["id"]), reverse=True)
+        return _page(leads, limit, "updated_at")
+
+    async def lead_statuses(self) -> List[str]:
+        return sorted({lead["status"] for lead in self.leads.values() if lead["status"]})
+
+    def _append(self, table: str, phone: str, item: Dict) -> Dict:
+        item = {"id": next(self._ids[table]), **item}
+        (self.conversations if table == "conversations" else self.logs)[phone].append(item)
+        return item
+
+    async def recent_history(self, phone: str, since: datetime, limit: int = 10) -> List[Dict]:
+        rows = [row for row in reversed(self.conversations.get(phone, ())) if row["timestamp"] >= since]
+        return [{"message": row["message"], "is_bot": row["is_bot"]} for row in rows[:limit]]
+
+    async def save_conversation(self, phone: str, message: str, is_bot: bool):
+        if phone not in self.leads:
+            self._insert_lead(phone)
+        self._append("conversations", phone, {"message": message, "is_bot": is_bot, "timestamp": self._clock.now()})
+
+    async def save_inbound_messages(self, messages: List[Dict]) -> List[Dict]:
+        new_leads = []
+        for m in messages:
+            if m["phone"] not in self.leads:
+                lead = self._insert_lead(m["phone"], m.get("name"))
+                new_leads.append({column: lead[column] for column in ("phone", "name", "status", "score")})
+            self._append("conversations", m["phone"],
+                         {"message": m["message"], "is_bot": False, "timestamp": self._clock.now()})
+        return new_leads
+
+    async def persist_message_exchange(self, lead: Dict, message: Optional[str], bot_response: str) -> Dict:
+        row = self._upsert(lead)
+        for text, is_bot in ((message, False), (bot_response, True)):
+            if text is not None:
+                self._append("conversations", lead["phone"],
+                             {"message": text, "is_bot": is_bot, "timestamp": self._clock.now()})
+        return row
+
+    async def history_page(self, table, phone, before=None, limit=50):
+        limit = max(1, min(limit, MAX_HISTORY_PAGE))
+        after = decode_cursor(before) if before else None
+        source = self.conversations if table == "conversations" else self.logs
+        items = [
+            dict(item) for item in reversed(source.get(phone, ()))
+            if after is None or (item["timestamp"], item["id"]) < after
+        ]
+        if table == "automation_logs":
+            items = [{key: item[key] for key in ("id", "trigger_type", "action_taken", "result", "timestamp")}
+                     for item in items]
+        return _page(items, limit, "timestamp")
+
+    async def write_logs(self, records: Sequence[Tuple]):
+        for record in records:
+            log = dict(zip(LOG_COLUMNS, record))
+            self._append("automation_logs", log["phone"], log)
+
+    async def rollup_rows(self) -> List[Dict]:
+        rows: Dict[Tuple[str, int], Dict] = {}
+        for lead in self.leads.values():
+            key = (lead["status"] or "", score_bucket(lead["score"]))
+            row = rows.setdefault(key, {"status": key[0], "bucket": key[1], "lead_count": 0, "score_sum": 0})
+            row["lead_count"] += 1
+            row["score_sum"] += lead["score"] or 0
+        return list(rows.values())
+
+    async def hot_leads(self, limit: int = 20) -> List[Dict]:
+        hot = [lead for lead in self.leads.values() if (lead["score"] or 0) >= HOT_LEAD_SCORE]
+        hot.sort(key=lambda lead: (lead["score"], lead["updated_at"]), reverse=True)
+        return [{key: lead[key] for key in ("phone", "name", "score", "updated_at")} for lead in hot[:limit]]
+
+    async def stats(self) -> Dict:
+        now = _utcnow()
+        return {
+            "total_leads": len(self.leads),
+            "total_messages": sum(len(rows) for rows in self.conversations.values()),
+            "total_automations": sum(len(rows) for rows in self.logs.values()),
+            "leads_today": sum(1 for lead in self.leads.values() if lead["created_at"] > now - timedelta(hours=24)),
+            "messages_last_hour": sum(
+                1 for rows in self.conversations.values() for row in rows
+                if row["timestamp"] > now - timedelta(hours=1)
+            ),
+            "pool_status": "n/a",
+        }
+
+
+# ==================== SQLITE (AIOSQLITE) ====================
+SQLITE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS leads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        phone TEXT UNIQUE NOT NULL,
+        name TEXT,
+        status TEXT DEFAULT 'new' CHECK (status IN ('new', 'cold', 'warm', 'hot', 'qualified', 'customer')),
+        score INTEGER DEFAULT 0 CHECK (score >= 0 AND score <= 100),
+        source TEXT DEFAULT 'whatsapp',
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_leads_status ON leads(status);
+    CREATE INDEX IF NOT EXISTS idx_leads_updated_at ON leads(updated_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_leads_score ON leads(score DESC, updated_at DESC);
+
+    CREATE TABLE IF NOT EXISTS conversations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        phone TEXT NOT NULL REFERENCES leads(phone) ON DELETE CASCADE,
+        message TEXT NOT NULL,
+        is_bot INTEGER NOT NULL DEFAULT 0,
+        timestamp TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_conversations_phone_timestamp ON conversations(phone, timestamp DESC);
+    CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp DESC);
+
+    CREATE TABLE IF NOT EXISTS automation_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        trigger_type TEXT NOT NULL,
+        phone TEXT NOT NULL,
+        action_taken TEXT,
+        result TEXT,
+        timestamp TEXT NOT NULL,
+        metadata TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_automation_logs_phone_timestamp ON automation_logs(phone, timestamp DESC);
+'''
+
+# Formato fixo (UTC, sempre com microssegundos): a ordem do texto é a ordem do tempo
+_SQLITE_TS = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _to_text(moment: Optional[datetime]) -> Optional[str]:
+    if moment is None:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime(_SQLITE_TS)
+
+
+def _from_text(text: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(text, _SQLITE_TS).replace(tzinfo=timezone.utc) if text else None
+
+
+def _sqlite_row(row, timestamps: Sequence[str] = ()) -> Dict:
+    item = dict(row)
+    for key in timestamps:
+        if key in item:
+            item[key] = _from_text(item[key])
+    if "is_bot" in item:
+        item["is_bot"] = bool(item["is_bot"])
+    return item
+
+
+def _escape_like(text: str) -> str:
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class SqliteStorage(Storage):
+    """Um arquivo SQLite (WAL) com uma conexão; escritas serializadas por um lock.
+    Para instalações pequenas: sem rollup por triggers nem busca trigram."""
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.search_mode = "like"
+        self._db = None
+        self._lock = asyncio.Lock()
+        self._clock = _Clock()
+
+    async def init(self):
+        try:
+            import aiosqlite
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=sqlite requer aiosqlite (pip install aiosqlite)") from e
+        self._db = await aiosqlite.connect(self.path)
+        self._db.row_factory = aiosqlite.Row
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA foreign_keys=ON")
+        await self._db.executescript(SQLITE_SCHEMA)
+        await self._db.commit()
+        logger.info("SQLite pronto", extra={"path": self.path})
+
+    async def close(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def _fetchall(self, query: str, *args) -> List:
+        async with self._db.execute(query, args) as cursor:
+            return list(await cursor.fetchall())
+
+    async def _fetchone(self, query: str, *args):
+        async with self._db.execute(query, args) as cursor:
+            return await cursor.fetchone()
+
+    async def ping(self) -> Dict:
+        row = await self._fetchone("SELECT 1")
+        return {"test_query": row[0], "pool_status": f"arquivo {self.path}"}
+
+    async def get_lead(self, phone: str) -> Optional[Dict]:
+        row = await self._fetchone('SELECT phone, name, status, score, source FROM leads WHERE phone = ?', phone)
+        return dict(row) if row else None
+
+    async def get_lead_detail(self, phone: str) -> Optional[Dict]:
+        row = await self._fetchone('SELECT * FROM leads WHERE phone = ?', phone)
+        return _sqlite_row(row, ("created_at", "updated_at")) if row else None
+
+    async def _upsert(self, lead: Dict) -> Dict:
+        """Dentro do lock: lê o estado anterior e faz o upsert (sem commit)"""
+        previous = await self._fetchone('SELECT status, score FROM leads WHERE phone = ?', lead["phone"])
+        now = _to_text(self._clock.now())
+        await self._db.execute('''
+            INSERT INTO leads (phone, name, status, score, source, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (phone) DO UPDATE SET
+                name = COALESCE(excluded.name, leads.name),
+                status = excluded.status,
+                score = excluded.score,
+                source = COALESCE(excluded.source, leads.source),
+                updated_at = excluded.updated_at
+        ''', (lead["phone"], lead.get("name"), lead["status"], lead["score"],
+              lead.get("source", "whatsapp"), now, now))
+        row = await self._fetchone('SELECT phone, name, status, score, source FROM leads WHERE phone = ?',
+                                   lead["phone"])
+        return _lead_upsert_result(dict(row), dict(previous) if previous else None)
+
+    async def upsert_lead(self, lead: Dict) -> Dict:
+        async with self._lock:
+            row = await self._upsert(lead)
+            await self._db.commit()
+        return row
+
+    async def delete_lead(self, lead_id: int) -> Optional[Dict]:
+        async with self._lock:
+            row = await self._fetchone('SELECT phone, status, score FROM leads WHERE id = ?', lead_id)
+            if row:
+                await self._db.execute('DELETE FROM leads WHERE id = ?', (lead_id,))
+                await self._db.commit()
+        return dict(row) if row else None
+
+    async def search_leads(self, status=None, search=None, cursor=None, limit=50):
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses, args = [], []
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        search = (search or "").strip()
+        if search:
+            digits = "".join(ch for ch in search if ch.isdigit())
+            clause = "name LIKE ? ESCAPE '\\'"
+            args.append(_escape_like(search))
+            if digits:
+                clause += " OR phone LIKE ? ESCAPE '\\'"
+                args.append(_escape_like(digits))
+            clauses.append(f"({clause})")
+        if cursor:
+            updated_at, lead_id = decode_cursor(cursor)
+            clauses.append("(updated_at, id) < (?, ?)")
+            args.extend([_to_text(updated_at), lead_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = await self._fetchall(f'''
+            SELECT {", ".join(LEAD_PAGE_COLUMNS)} FROM leads {where}
+            ORDER BY updated_at DESC, id DESC LIMIT ?
+        ''', *args, limit + 1)
+        return _page([_sqlite_row(row, ("created_at", "updated_at")) for row in rows], limit, "updated_at")
+
+    async def lead_statuses(self) -> List[str]:
+        rows = await self._fetchall("SELECT DISTINCT status FROM leads WHERE status <> '' ORDER BY status")
+        return [row["status"] for row in rows]
+
+    async def recent_history(self, phone: str, since: datetime, limit: int = 10) -> List[Dict]:
+        rows = await self._fetchall(
+            'SELECT message, is_bot FROM conversations WHERE phone = ? AND timestamp >= ? '
+            'ORDER BY timestamp DESC, id DESC LIMIT ?',
+            phone, _to_text(since), limit
+        )
+        return [{"message": row["message"], "is_bot": bool(row["is_bot"])} for row in rows]
+
+    async def _insert_conversations(self, rows: List[Tuple[str, str, bool]]):
+        await self._db.executemany(
+            'INSERT INTO conversations (phone, message, is_bot, timestamp) VALUES (?, ?, ?, ?)',
+            [(phone, message, int(is_bot), _to_text(self._clock.now())) for phone, message, is_bot in rows]
+        )
+
+    async def save_conversation(self, phone: str, message: str, is_bot: bool):
+        async with self._lock:
+            now = _to_text(self._clock.now())
+            await self._db.execute(
+                "INSERT INTO leads (phone, status, score, created_at, updated_at) VALUES (?, 'new', 0, ?, ?) "
+                "ON CONFLICT (phone) DO NOTHING",
+                (phone, now, now)
+            )
+            await self._insert_conversations([(phone, message, is_bot)])
+            await self._db.commit()
+
+    async def save_inbound_messages(self, messages: List[Dict]) -> List[Dict]:
+        new_leads = []
+        async with self._lock:
+            for m in messages:
+                now = _to_text(self._clock.now())
+                cursor = await self._db.execute(
+                    "INSERT INTO leads (phone, name, status, score, created_at, updated_at) "
+                    "VALUES (?, ?, 'new', 0, ?, ?) ON CONFLICT (phone) DO NOTHING",
+                    (m["phone"], m.get("name"), now, now)
+                )
+                if cursor.rowcount:
+                    new_leads.append({"phone": m["phone"], "name": m.get("name"), "status": "new", "score": 0})
+            await self._insert_conversations([(m["phone"], m["message"], False) for m in messages])
+            await self._db.commit()
+        return new_leads
+
+    async def persist_message_exchange(self, lead: Dict, message: Optional[str], bot_response: str) -> Dict:
+        async with self._lock:
+            row = await self._upsert(lead)
+            await self._insert_conversations([
+                (lead["phone"], text, is_bot)
+                for text, is_bot in ((message, False), (bot_response, True)) if text is not None
+            ])
+            await self._db.commit()
+        return row
+
+    async def history_page(self, table, phone, before=None, limit=50):
+        limit = max(1, min(limit, MAX_HISTORY_PAGE))
+        args: List = [phone]
+        before_clause = ""
+        if before:
+            moment, row_id = decode_cursor(before)
+            args.extend([_to_text(moment), row_id])
+            before_clause = "AND (timestamp, id) < (?, ?)"
+        args.append(limit + 1)
+        query = HISTORY_QUERIES[table].format(before=before_clause, limit="?").replace("$1", "?")
+        rows = await self._fetchall(query, *args)
+        return _page([_sqlite_row(row, ("timestamp",)) for row in rows], limit, "timestamp")
+
+    async def write_logs(self, records: Sequence[Tuple]):
+        async with self._lock:
+            await self._db.executemany(
+                f'INSERT INTO automation_logs ({", ".join(LOG_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)',
+                [(*record[:4], _to_text(record[4]), record[5]) for record in records]
+            )
+            await self._db.commit()
+
+    async def rollup_rows(self) -> List[Dict]:
+        rows = await self._fetchall('''
+            SELECT COALESCE(status, '') AS status,
+                   CASE
+                       WHEN score IS NULL THEN -1
+                       WHEN score <= 19 THEN 0
+                       WHEN score <= 49 THEN 1
+                       WHEN score <= 74 THEN 2
+                       WHEN score <= 84 THEN 3
+                       ELSE 4
+                   END AS bucket,
+                   COUNT(*) AS lead_count, COALESCE(SUM(score), 0) AS score_sum
+            FROM leads
+            GROUP BY 1, 2
+        ''')
+        return [dict(row) for row in rows]
+
+    async def hot_leads(self, limit: int = 20) -> List[Dict]:
+        rows = await self._fetchall(
+            'SELECT phone, name, score, updated_at FROM leads WHERE score >= ? '
+            'ORDER BY score DESC, updated_at DESC LIMIT ?',
+            HOT_LEAD_SCORE, limit
+        )
+        return [_sqlite_row(row, ("updated_at",)) for row in rows]
+
+    async def stats(self) -> Dict:
+        now = _utcnow()
+        row = await self._fetchone('''
+            SELECT
+                (SELECT COUNT(*) FROM leads) AS total_leads,
+                (SELECT COUNT(*) FROM conversations) AS total_messages,
+                (SELECT COUNT(*) FROM automation_logs) AS total_automations,
+                (SELECT COUNT(*) FROM leads WHERE created_at > ?) AS leads_today,
+                (SELECT COUNT(*) FROM conversations WHERE timestamp > ?) AS messages_last_hour
+        ''', _to_text(now - timedelta(hours=24)), _to_text(now - timedelta(hours=1)))
+        return {**dict(row), "pool_status": f"arquivo {self.path}"}
+
+
+def create_storage(backend: str, pool_getter: Callable, sqlite_path: str = "previdas.db",
+                   statements: Optional[StatementRegistry] = None, auto_migrate: bool = True) -> Storage:
+    if backend == "postgres":
+        return PostgresStorage(pool_getter, statements, auto_migrate)
+    if backend == "sqlite":
+        return SqliteStorage(sqlite_path)
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"STORAGE_BACKEND deve ser um de: {', '.join(STORAGE_BACKENDS)}")
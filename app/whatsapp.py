@@ -0,0 +1,53 @@
+# ==================== PAYLOADS DO WEBHOOK WHATSAPP ====================
+from typing import Dict, List, Optional, Tuple
+
+
+def _message_text(message: Dict) -> Optional[str]:
+    """Texto de uma mensagem da Cloud API (texto, botão ou resposta interativa)"""
+    kind = message.get("type", "text")
+    if kind == "text":
+        return (message.get("text") or {}).get("body")
+    if kind == "button":
+        return (message.get("button") or {}).get("text")
+    if kind == "interactive":
+        interactive = message.get("interactive") or {}
+        reply = interactive.get("button_reply") or interactive.get("list_reply") or {}
+        return reply.get("title")
+    return None
+
+
+def extract_inbound_messages(payload: Dict) -> Tuple[List[Dict], int]:
+    """Extrai as mensagens de texto de um POST do webhook.
+
+    Aceita o envelope em lote da WhatsApp Cloud API
+    (`entry[].changes[].value.messages[]`, com `statuses[]` e `contacts[]`) e o formato
+    simples `{"from": ..., "text": {"body": ...}}`. Retorna (mensagens, nº de statuses);
+    cada mensagem tem `from`, `body`, `id` e `name` (perfil do contato, se houver).
+    """
+    if "entry" not in payload:
+        body = (payload.get("text") or {}).get("body", "")
+        if payload.get("from") and body:
+            return [{"from": payload["from"], "body": body, "id": payload.get("id"), "name": None}], 0
+        return [], 0
+
+    messages: List[Dict] = []
+    statuses = 0
+    for entry in payload.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            statuses += len(value.get("statuses") or [])
+            names = {
+                contact.get("wa_id"): (contact.get("profile") or {}).get("name")
+                for contact in value.get("contacts") or []
+            }
+            for message in value.get("messages") or []:
+                body = _message_text(message)
+                if not message.get("from") or not body:
+                    continue
+                messages.append({
+                    "from": message["from"],
+                    "body": body,
+                    "id": message.get("id"),
+                    "name": names.get(message["from"]),
+                })
+    return messages, statuses
@@ -0,0 +1,45 @@
+# ==================== WORKER STANDALONE DA FILA DE JOBS ====================
+# Uso: JOB_QUEUE_MODE=postgres python -m app.worker [--workers 2] [--batch-size 10]
+import argparse
+import asyncio
+import logging
+import signal
+from typing import Optional
+
+from app.main import close_services, create_job_worker, init_db
+
+logger = logging.getLogger(__name__)
+
+
+async def run_workers(workers: int, batch_size: Optional[int] = None):
+    """Executa N loops de worker no mesmo processo até SIGINT/SIGTERM"""
+    await init_db()
+    overrides = {"batch_size": batch_size} if batch_size else {}
+    pool_workers = [create_job_worker(**overrides) for _ in range(workers)]
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: [w.stop() for w in pool_workers])
+        except NotImplementedError:
+            pass  # Windows: encerra via KeyboardInterrupt
+
+    try:
+        await asyncio.gather(*(w.run() for w in pool_workers))
+    finally:
+        for worker in pool_workers:
+            logger.info("Worker finalizado", extra={"worker": worker.stats()})
+        # Workers já pararam de reservar jobs: mesma ordem de shutdown do servidor
+        await close_services()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker da fila durável de automações Previdas")
+    parser.add_argument("--workers", type=int, default=1, help="loops de worker neste processo")
+    parser.add_argument("--batch-size", type=int, default=None, help="jobs reservados por ciclo (padrão: JOB_WORKER_BATCH)")
+    args = parser.parse_args()
+    asyncio.run(run_workers(args.workers, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()